@@ -0,0 +1,8 @@
+"""Нагрузочные замеры проекта.
+
+Запуск из каталога yatube/, например:
+    python -m benchmarks.pagination --posts 1000000
+
+Каждый замер работает на собственной временной базе и не трогает
+db.sqlite3 проекта.
+"""
@@ -0,0 +1,104 @@
+"""FileBasedCache против core.cache.SQLiteCache: get, set и вытеснение.
+
+    python -m benchmarks.cache --keys 5000
+
+Оба кеша наполняются одинаковыми фрагментами на --keys ключей, затем
+замеряются: set и get по одному ключу, get_many/set_many пачками по
+--batch ключей и запись в переполненный кеш (MAX_ENTRIES меньше числа
+ключей), где каждый бэкенд вытесняет записи по-своему. В отчёте -
+среднее время операции и худшее время одной записи при вытеснении.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.utils import report
+
+BACKENDS = {
+    'FileBasedCache': 'django.core.cache.backends.filebased.FileBasedCache',
+    'SQLiteCache': 'core.cache.SQLiteCache',
+}
+
+
+def django_setup():
+    import django
+    from django.conf import settings
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    settings.DEBUG = False
+    django.setup()
+
+
+def make_cache(backend, workdir, max_entries):
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.utils.module_loading import import_string
+
+    location = os.path.join(workdir, backend)
+    if import_string(BACKENDS[backend]) is not FileBasedCache:
+        location = os.path.join(location, 'cache.sqlite3')
+    return import_string(BACKENDS[backend])(
+        location, {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    )
+
+
+def per_operation(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return (time.perf_counter() - start) * 1e6 / len(items)
+
+
+def measure(backend, args, workdir):
+    keys = [f'template.cache.fragment.{number}' for number in range(args.keys)]
+    value = 'x' * args.size
+    results = {}
+    cache = make_cache(backend, workdir, args.keys * 2)
+    results['set'] = per_operation(lambda key: cache.set(key, value), keys)
+    results['get'] = per_operation(cache.get, keys)
+    batches = [
+        keys[start:start + args.batch]
+        for start in range(0, len(keys), args.batch)
+    ]
+    results['get_many'] = per_operation(cache.get_many, batches)
+    results['set_many'] = per_operation(
+        lambda batch: cache.set_many(dict.fromkeys(batch, value)), batches
+    )
+
+    # Кеш, заполненный до предела: каждая новая запись может вызвать
+    # вытеснение.
+    cache = make_cache(backend, workdir + '-cull', args.keys // 2)
+    worst = 0
+    start = time.perf_counter()
+    for key in keys:
+        begin = time.perf_counter()
+        cache.set(key, value)
+        worst = max(worst, time.perf_counter() - begin)
+    results['set с вытеснением'] = (
+        (time.perf_counter() - start) * 1e6 / len(keys)
+    )
+    results['худший set с вытеснением'] = worst * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keys', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--size', type=int, default=2000,
+                        help='размер значения в байтах')
+    args = parser.parse_args()
+    django_setup()
+    for backend in BACKENDS:
+        workdir = tempfile.mkdtemp(prefix='yatube-bench-')
+        try:
+            results = measure(backend, args, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            shutil.rmtree(workdir + '-cull', ignore_errors=True)
+        report(f'{backend}, {args.keys} ключей', results, unit='µs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Глубокие страницы ленты: Paginator (OFFSET) против курсоров.
+
+    python -m benchmarks.pagination --posts 1000000 --pages 1 100 1000
+"""
+import argparse
+import datetime as dt
+
+from benchmarks.utils import report, setup_django, timer
+
+PER_PAGE = 10
+
+
+def fill(posts):
+    from django.db import connection, transaction
+    from posts.models import Post, User
+
+    if Post.objects.count() >= posts:
+        return
+    author, _ = User.objects.get_or_create(username='bench')
+    start = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+    table = Post._meta.db_table
+    sql = (
+        f'INSERT INTO {table} (text, pub_date, author_id, image) '
+        'VALUES (%s, %s, %s, %s)'
+    )
+    batch = 50000
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, posts, batch):
+            cursor.executemany(sql, [
+                (f'post {i}', start + dt.timedelta(seconds=i), author.pk, '')
+                for i in range(offset, min(offset + batch, posts))
+            ])
+
+
+def run(pages, repeat):
+    from django.core.paginator import Paginator
+    from posts.models import Post
+    from posts.paginators import (FEED_ORDERING, CursorPaginator,
+                                  encode_cursor)
+
+    queryset = Post.objects.order_by(*FEED_ORDERING)
+    results = {}
+    for number in pages:
+        with timer(results, f'offset page {number}'):
+            for _ in range(repeat):
+                list(Paginator(queryset, PER_PAGE).page(number))
+        if number == 1:
+            after = None
+        else:
+            last = queryset[(number - 1) * PER_PAGE - 1]
+            after = encode_cursor([last.pub_date, last.pk])
+        with timer(results, f'cursor page {number}'):
+            for _ in range(repeat):
+                list(CursorPaginator(queryset, PER_PAGE).page(after=after))
+    return {label: value / repeat for label, value in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--pages', type=int, nargs='+',
+                        default=[1, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database', help='переиспользовать файл базы')
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    fill(args.posts)
+    report(
+        f'Средняя задержка страницы, {args.posts} постов',
+        run(args.pages, args.repeat)
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Задержка полнотекстового поиска: подсчёт совпадений и первая страница.
+
+    python -m benchmarks.search --posts 1000000
+
+Тексты постов - случайные слова из словаря с распределением Ципфа,
+поэтому в запросах есть и редкие, и очень частые слова.
+"""
+import argparse
+import datetime as dt
+import random
+
+from benchmarks.utils import report, setup_django, timer
+
+PER_PAGE = 10
+VOCABULARY = 50000
+WORDS_PER_POST = 30
+AUTHORS = 1000
+GROUPS = 50
+
+
+def word(rank):
+    return f'слово{rank}'
+
+
+def fill(posts):
+    from django.db import connection, transaction
+    from posts.models import Group, Post, User
+
+    if Post.objects.count() >= posts:
+        return
+    User.objects.bulk_create(
+        [User(username=f'bench{number}') for number in range(AUTHORS)]
+    )
+    Group.objects.bulk_create(
+        [Group(title=f'g{number}', slug=f'g{number}')
+         for number in range(GROUPS)]
+    )
+    authors = list(User.objects.values_list('pk', flat=True))
+    groups = list(Group.objects.values_list('pk', flat=True))
+    ranks = range(1, VOCABULARY + 1)
+    weights = [1 / rank for rank in ranks]
+    start = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+    table = Post._meta.db_table
+    sql = (
+        f'INSERT INTO {table} (text, pub_date, author_id, group_id, image) '
+        'VALUES (%s, %s, %s, %s, %s)'
+    )
+    random.seed(0)
+    batch = 20000
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, posts, batch):
+            rows = []
+            for number in range(offset, min(offset + batch, posts)):
+                text = ' '.join(
+                    word(rank) for rank in
+                    random.choices(ranks, weights, k=WORDS_PER_POST)
+                )
+                rows.append((
+                    text, start + dt.timedelta(seconds=number),
+                    random.choice(authors), random.choice(groups), '',
+                ))
+            cursor.executemany(sql, rows)
+        cursor.execute(
+            "INSERT INTO posts_post_search(posts_post_search) "
+            "VALUES ('optimize')"
+        )
+
+
+def run(repeat):
+    from django.core.paginator import Paginator
+    from posts.models import Group, User
+    from posts.search import search_posts
+
+    author = User.objects.get(username='bench0')
+    group = Group.objects.get(slug='g0')
+    queries = {
+        'редкое слово': (word(40000), {}),
+        'среднее слово': (word(500), {}),
+        'слово на границе ранжирования': (word(270), {}),
+        'частое слово': (word(1), {}),
+        'два частых слова': (f'{word(1)} {word(2)}', {}),
+        'частое + автор': (word(1), {'author': author}),
+        'частое + группа': (word(1), {'group': group}),
+        'редкое + частое': (f'{word(40000)} {word(1)}', {}),
+        'среднее + группа': (word(500), {'group': group}),
+    }
+    results = {}
+    for label, (text, filters) in queries.items():
+        with timer(results, label):
+            for _ in range(repeat):
+                list(Paginator(search_posts(text, **filters), PER_PAGE)
+                     .page(1))
+        results[label] /= repeat
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database', help='переиспользовать файл базы')
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    fill(args.posts)
+    report(f'Средняя задержка поиска, {args.posts} постов', run(args.repeat))
+
+
+if __name__ == '__main__':
+    main()
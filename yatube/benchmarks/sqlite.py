@@ -0,0 +1,166 @@
+"""Параллельные чтения и записи SQLite: без настроек и с core/sqlite.py.
+
+    python -m benchmarks.sqlite --readers 4 --writers 4 --seconds 10
+
+Читатели открывают страницу ленты, писатели добавляют комментарии, и
+каждая операция заканчивается как запрос: close_old_connections().
+"до" - журнал по умолчанию, без PRAGMA и CONN_MAX_AGE = 0 (соединение
+на каждый запрос), "после" - настройки проекта. Каждый участник -
+отдельный процесс, чтобы не мешал GIL.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import report
+
+CONFIGS = ('до', 'после')
+
+
+def django_setup(path, config):
+    import django
+    from django.conf import settings
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    database = settings.DATABASES['default']
+    database['NAME'] = path
+    settings.DEBUG = False
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    if config == 'до':
+        database['CONN_MAX_AGE'] = 0
+        # Время ожидания sqlite3 по умолчанию, без PRAGMA busy_timeout.
+        settings.SQLITE_PRAGMAS = {'journal_mode': 'delete'}
+    django.setup()
+
+
+def prepare(path, config, posts):
+    from django.core.management import call_command
+    from django.db import transaction
+
+    django_setup(path, config)
+    call_command('migrate', verbosity=0)
+    from posts.models import Post, User
+
+    author = User.objects.create_user(username='bench')
+    with transaction.atomic():
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for number in range(posts)
+        )
+
+
+def read(state):
+    from posts.models import Post
+    from posts.paginators import FEED_ORDERING
+
+    list(Post.objects.feed().order_by(*FEED_ORDERING)[:10])
+
+
+def write(state):
+    from posts.models import Comment
+
+    Comment.objects.create(
+        post_id=state['post_id'], author_id=state['author_id'],
+        text='Комментарий',
+    )
+
+
+ROLES = {'reader': read, 'writer': write}
+
+
+def worker(path, config, role, start, deadline):
+    django_setup(path, config)
+    from django.db import OperationalError, close_old_connections
+    from posts.models import Post
+
+    post = Post.objects.order_by('-id').values('id', 'author_id').first()
+    state = {'post_id': post['id'], 'author_id': post['author_id']}
+    close_old_connections()
+    # Все участники начинают одновременно, после запуска Django.
+    time.sleep(max(0, start - time.time()))
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            ROLES[role](state)
+            done += 1
+        except OperationalError:
+            errors += 1
+        close_old_connections()
+    print(json.dumps({'done': done, 'errors': errors}))
+
+
+def run(config, args):
+    workdir = tempfile.mkdtemp(prefix='yatube-bench-')
+    path = os.path.join(workdir, 'bench.sqlite3')
+    command = [sys.executable, '-m', 'benchmarks.sqlite', '--path', path,
+               '--config', config]
+    subprocess.run(
+        command + ['--prepare', '--posts', str(args.posts)], check=True
+    )
+    start = time.time() + 3
+    deadline = start + args.seconds
+    roles = ['reader'] * args.readers + ['writer'] * args.writers
+    processes = [
+        (role, subprocess.Popen(
+            command + ['--worker', role, '--start', str(start),
+                       '--deadline', str(deadline)],
+            stdout=subprocess.PIPE, text=True,
+        ))
+        for role in roles
+    ]
+    totals = {role: {'done': 0, 'errors': 0} for role in ROLES}
+    for role, process in processes:
+        output, _ = process.communicate()
+        for key, value in json.loads(output).items():
+            totals[role][key] += value
+    shutil.rmtree(workdir, ignore_errors=True)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    parser.add_argument('--config', choices=CONFIGS, help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--worker', choices=ROLES, help=argparse.SUPPRESS)
+    parser.add_argument('--start', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--deadline', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.prepare:
+        prepare(args.path, args.config, args.posts)
+        return
+    if args.worker:
+        worker(args.path, args.config, args.worker, args.start,
+               args.deadline)
+        return
+
+    throughput, errors = {}, {}
+    for config in CONFIGS:
+        totals = run(config, args)
+        for role, counts in totals.items():
+            throughput[f'{config}: {role}'] = counts['done'] / args.seconds
+            errors[f'{config}: {role}'] = counts['errors']
+    report(
+        f'Операций в секунду, {args.readers} читателей, '
+        f'{args.writers} писателей',
+        throughput, unit='op/s',
+    )
+    report('Ошибок "database is locked"', errors, unit='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Пиковая память процесса на одну загрузку картинки.
+
+    python -m benchmarks.upload --width 8000 --height 6000
+
+"до" - загрузка целиком в память, проверка обычным ImageField и
+декодирование оригинала (его потом открывают миниатюры); "после" -
+загрузка во временный файл и posts.uploads.process_image.
+
+Каждый вариант запускается в отдельном процессе, потому что ru_maxrss
+только растёт и наследуется от родителя; по той же причине исходная
+картинка тоже готовится в отдельном процессе.
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import report
+
+CHUNK = 64 * 1024
+
+
+def peak_rss():
+    # На Linux ru_maxrss в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_source(path, width, height):
+    from PIL import Image
+
+    # Гладкий шум: похоже на фотографию и укладывается в лимит размера.
+    bands = [
+        Image.effect_noise((width // 8, height // 8), 64)
+        .resize((width, height), Image.BICUBIC)
+        for _ in range(3)
+    ]
+    Image.merge('RGB', bands).save(path, 'JPEG', quality=90)
+
+
+def upload_before(path):
+    from django import forms
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    with open(path, 'rb') as source:
+        upload = SimpleUploadedFile('source.jpg', source.read(),
+                                    'image/jpeg')
+    upload = forms.ImageField().clean(upload)
+    with Image.open(upload) as image:
+        image.load()
+
+
+def upload_after(path):
+    from django import forms
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+    from PIL import Image
+
+    from posts.uploads import process_image
+
+    upload = TemporaryUploadedFile('source.jpg', 'image/jpeg', 0, None)
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK), b''):
+            upload.write(chunk)
+    upload.size = upload.tell()
+    upload = forms.ImageField().clean(upload)
+    result, _, _ = process_image(upload)
+    with Image.open(result) as image:
+        image.load()
+    upload.close()
+
+
+VARIANTS = {
+    'до': upload_before,
+    'после': upload_after,
+}
+
+
+def worker(variant, path):
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    django.setup()
+    baseline = peak_rss()
+    VARIANTS[variant](path)
+    print(peak_rss() - baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=8000)
+    parser.add_argument('--height', type=int, default=6000)
+    parser.add_argument('--worker', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--make-source', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.make_source:
+        make_source(args.source, args.width, args.height)
+        return
+    if args.worker:
+        worker(args.worker, args.source)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='yatube-bench-')
+    try:
+        path = os.path.join(workdir, 'source.jpg')
+        command = [sys.executable, '-m', 'benchmarks.upload',
+                   '--source', path]
+        subprocess.run(
+            command + ['--make-source', '--width', str(args.width),
+                       '--height', str(args.height)],
+            check=True,
+        )
+        results = {}
+        for variant in VARIANTS:
+            output = subprocess.run(
+                command + ['--worker', variant],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[variant] = float(output)
+        size = os.path.getsize(path) / 1024 / 1024
+        report(
+            f'Прирост пиковой памяти на загрузку, '
+            f'{args.width}x{args.height}, {size:.1f} MB',
+            results, unit='MB'
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
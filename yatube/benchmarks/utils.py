@@ -0,0 +1,52 @@
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django(database=None):
+    """Поднимает Django на временной тестовой базе.
+
+    Возвращает путь к файлу базы. Если путь не передан, база создаётся
+    во временном каталоге, который удаляется при выходе из процесса.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    from django.conf import settings
+
+    name = database
+    if name is None:
+        workdir = tempfile.mkdtemp(prefix='yatube-bench-')
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        name = os.path.join(workdir, 'bench.sqlite3')
+    settings.DATABASES['default']['TEST'] = {'NAME': name}
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    settings.DEBUG = False
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, keepdb=True)
+    return name
+
+
+@contextmanager
+def timer(results, label):
+    start = time.perf_counter()
+    yield
+    results[label] = (time.perf_counter() - start) * 1000
+
+
+def report(title, results, unit='ms'):
+    print(title)
+    for label, value in results.items():
+        print(f'  {label:<40} {value:10.2f} {unit}')
@@ -0,0 +1,81 @@
+"""Пользователь запроса из кеша.
+
+AuthenticationMiddleware на каждом запросе достаёт пользователя через
+бэкенд авторизации. CachedModelBackend сначала смотрит в общий кеш и
+идёт в auth_user только при промахе. Запись сбрасывается при любом
+сохранении или удалении пользователя (смена пароля, правка в админке,
+обновление last_login при входе) и при выходе.
+
+Кеш - общий, мимо LRU процесса (core/cache.py): иначе после смены
+пароля другие процессы ещё LOCAL_TIMEOUT пускали бы по старой сессии.
+
+Хеш пароля в кеш не попадает. Пользователь из кеша собирается с
+отложенным полем password: его прочитает из базы только то, что
+проверяет пароль, а сессия сверяется с хешем сессии, который хранится
+вместе с полями.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.db import router
+from django.dispatch import receiver
+
+USER_KEY = 'core:auth:user:{}'
+
+
+def _cache():
+    return getattr(cache, 'shared', cache)
+
+
+def invalidate(user_id):
+    _cache().delete(USER_KEY.format(user_id))
+
+
+def _cached_fields(user):
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != 'password'
+    }
+
+
+def _from_cache(fields, session_hash):
+    model = get_user_model()
+    user = model.from_db(
+        router.db_for_read(model), list(fields), list(fields.values())
+    )
+    # Хеш сессии считается от хеша пароля, которого в кеше нет.
+    user.get_session_auth_hash = lambda: session_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id)
+        cached = _cache().get(key)
+        if cached is not None:
+            user = _from_cache(*cached)
+            return user if self.user_can_authenticate(user) else None
+        user = super().get_user(user_id)
+        if user is not None:
+            _cache().set(
+                key,
+                (_cached_fields(user), user.get_session_auth_hash()),
+                settings.AUTH_USER_CACHE_TIMEOUT,
+            )
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate(user.pk)
@@ -0,0 +1,509 @@
+"""Двухуровневый кеш: LRU процесса перед общим кешем.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'LOCATION': 'default',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+            },
+        },
+        'shared': {...},
+    }
+
+Чтение сначала ищет ключ в LRU процесса (общем для всех потоков,
+LOCATION различает разные TieredCache), потом в общем кеше SHARED.
+Запись и удаление идут в оба уровня. Чужие записи в общий кеш
+становятся видны не позже LOCAL_TIMEOUT секунд; чтобы изменение было
+видно сразу, его надо выразить версией ключа - номером версии Django
+или поколением в самом ключе (posts/feed_cache.py). Счётчики
+поколений читаются из shared мимо LRU.
+
+Неизменяемые значения лежат в LRU как есть, остальные - в pickle,
+чтобы изменения объекта у вызывающего не попадали в кеш.
+
+get_or_fill - заполнение кеша без лавины пересчётов, см. его описание.
+
+SQLiteCache - локальный кеш в одном файле SQLite вместо каталога
+файлов FileBasedCache, см. его описание.
+"""
+import logging
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import DatabaseError
+
+from .lru import LRU
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+IMMUTABLE = (str, bytes, int, float, bool, type(None))
+# Замок пересчёта живёт не дольше этого, если его владелец упал.
+FILL_LOCK_TIMEOUT = 30
+# Сколько ждать чужого пересчёта, когда значения в кеше нет вовсе.
+FILL_WAIT = 2
+FILL_WAIT_STEP = 0.05
+
+
+class Tier:
+    """LRU процесса и счётчики попаданий по уровням."""
+
+    def __init__(self, max_entries, timeout):
+        self.lru = LRU(max_entries, ttl=timeout)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def count(self, tier, hit):
+        with self._lock:
+            self.stats[tier]['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {tier: dict(counts) for tier, counts in self.stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                'local': {'hits': 0, 'misses': 0},
+                'shared': {'hits': 0, 'misses': 0},
+            }
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def freeze(value):
+    if type(value) in IMMUTABLE:
+        return False, value
+    return True, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def thaw(item):
+    pickled, value = item
+    return pickle.loads(value) if pickled else value
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options['SHARED']
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = Tier(
+                    options.get('LOCAL_MAX_ENTRIES', 1000),
+                    self.local_timeout,
+                )
+            self.tier = _tiers[location]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _remember(self, local_key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self.local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            if timeout <= 0:
+                self.tier.lru.delete(local_key)
+                return
+            ttl = min(ttl, timeout)
+        self.tier.lru.set(local_key, freeze(value), ttl)
+
+    def stats(self):
+        """Попадания и промахи по уровням с запуска процесса."""
+        return self.tier.snapshot()
+
+    def reset_stats(self):
+        self.tier.reset_stats()
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        item = self.tier.lru.get(local_key, _MISSING)
+        self.tier.count('local', item is not _MISSING)
+        if item is not _MISSING:
+            return thaw(item)
+        value = self.shared.get(key, _MISSING, version=version)
+        self.tier.count('shared', value is not _MISSING)
+        if value is _MISSING:
+            return default
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, {}
+        for key in keys:
+            local_key = self._local_key(key, version)
+            item = self.tier.lru.get(local_key, _MISSING)
+            self.tier.count('local', item is not _MISSING)
+            if item is _MISSING:
+                missing[key] = local_key
+            else:
+                found[key] = thaw(item)
+        if missing:
+            shared = self.shared.get_many(list(missing), version=version)
+            for key, local_key in missing.items():
+                self.tier.count('shared', key in shared)
+                if key in shared:
+                    self._remember(local_key, shared[key])
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(self._local_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        # Одним вызовом общего кеша: SQLiteCache пишет пачку в одной
+        # транзакции, а не по записи на ключ.
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(self._local_key(key, version), value, timeout)
+        return failed
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        local_key = self._local_key(key, version)
+        item = self.tier.lru.get(local_key, _MISSING)
+        self.tier.count('local', item is not _MISSING)
+        if item is not _MISSING:
+            return thaw(item)
+        value = self.shared.get_or_set(key, default, timeout, version=version)
+        if value is not None:
+            self._remember(local_key, value, timeout)
+        return value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(local_key, value, timeout)
+        else:
+            # В общем кеше значение есть, и оно может отличаться от LRU.
+            self.tier.lru.delete(local_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.shared.touch(key, timeout, version=version)
+        expired = (
+            timeout is not DEFAULT_TIMEOUT and timeout is not None
+            and timeout <= 0
+        )
+        if not touched or expired:
+            self.tier.lru.delete(self._local_key(key, version))
+        return touched
+
+    def delete(self, key, version=None):
+        self.tier.lru.delete(self._local_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.tier.lru.delete(self._local_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if self.tier.lru.get(local_key, _MISSING) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(self._local_key(key, version), value)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.tier.lru.clear()
+        self.shared.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в таблице SQLite: LOCATION - путь к файлу.
+
+    Ключ - первичный ключ таблицы, срок - проиндексированная колонка.
+    Истёкшие записи удаляются понемногу, по CULL_BATCH раз в
+    CULL_EVERY записей, а при переполнении MAX_ENTRIES вытесняется
+    доля 1/CULL_FREQUENCY записей с ближайшим сроком - без обхода
+    всех записей, как у FileBasedCache. get_many, set_many и
+    delete_many - один запрос или одна транзакция. У каждого потока
+    (экземпляра бэкенда) своё соединение.
+    """
+    CULL_EVERY = 100
+    CULL_BATCH = 500
+    # Столько параметров SQLite гарантированно принимает в запросе.
+    CHUNK = 500
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+
+    @property
+    def connection(self):
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('PRAGMA synchronous = normal')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL NOT NULL) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return math.inf if expires is None else expires
+
+    def _chunks(self, items):
+        items = list(items)
+        for start in range(0, len(items), self.CHUNK):
+            yield items[start:start + self.CHUNK]
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes < self.CULL_EVERY:
+            return
+        self._writes = 0
+        self._cull()
+
+    def _cull(self):
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'WHERE expires <= ? ORDER BY expires LIMIT ?)',
+            (time.time(), self.CULL_BATCH),
+        )
+        count = connection.execute('SELECT count(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY expires LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
+
+    def get(self, key, default=None, version=None):
+        row = self.connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = {}
+        now = time.time()
+        for chunk in self._chunks(keys):
+            rows = self.connection.execute(
+                'SELECT key, value FROM cache WHERE key IN ({}) '
+                'AND expires > ?'.format(', '.join('?' * len(chunk))),
+                (*chunk, now),
+            )
+            for key, value in rows:
+                found[keys[key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self._expires(timeout),
+            ),
+        )
+        self._written()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                expires,
+            )
+            for key, value in data.items()
+        ]
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                rows,
+            )
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Истёкшая запись не мешает add, как и в других бэкендах.
+        cursor = self.connection.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires WHERE cache.expires <= ?',
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self._expires(timeout),
+                time.time(),
+            ),
+        )
+        self._written()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # BEGIN IMMEDIATE: прочитать и записать под одной блокировкой,
+        # чтобы параллельные incr из разных процессов не терялись.
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            row = self.connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND expires > ?',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            self.connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        self.connection.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self.connection:
+            self.connection.execute('BEGIN')
+            for chunk in self._chunks(keys):
+                self.connection.execute(
+                    'DELETE FROM cache WHERE key IN ({})'.format(
+                        ', '.join('?' * len(chunk))
+                    ),
+                    chunk,
+                )
+
+    def has_key(self, key, version=None):
+        return self.connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND expires > ?',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+
+def _fill(cache, key, compute, timeout, grace):
+    started = time.monotonic()
+    value = compute()
+    duration = time.monotonic() - started
+    if timeout is None:
+        cache.set(key, (value, duration, math.inf), None)
+    else:
+        cache.set(
+            key, (value, duration, time.time() + timeout), timeout + grace
+        )
+    return value
+
+
+def get_or_fill(key, compute, timeout, grace=0, beta=1.0,
+                cache=default_cache):
+    """Значение key из кеша; при отсутствии - compute(), и в кеш.
+
+    Против лавины одновременных пересчётов:
+    - пересчитывает один процесс - тот, кто взял замок cache.add;
+      остальные отдают старое значение, а если его нет, ждут до
+      FILL_WAIT секунд и только потом считают сами;
+    - пересчёт может начаться раньше истечения timeout, с
+      вероятностью тем выше, чем ближе срок и дольше прошлый
+      пересчёт (XFetch, beta - его множитель), так что запросы не
+      упираются в истечение все разом;
+    - после timeout значение ещё grace секунд лежит в кеше и
+      отдаётся, пока его пересчитывают, и если пересчёт падает с
+      ошибкой базы.
+    """
+    lock = f'{key}:fill-lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, duration, expires = entry
+        # 1 - random() в (0, 1]: логарифм не бывает бесконечным.
+        early = -duration * beta * math.log(1 - random.random())
+        if time.time() + early < expires:
+            return value
+        if not cache.add(lock, 1, FILL_LOCK_TIMEOUT):
+            return value
+        try:
+            return _fill(cache, key, compute, timeout, grace)
+        except DatabaseError:
+            logger.warning('Отдаю устаревший %s: ошибка базы', key,
+                           exc_info=True)
+            return value
+        finally:
+            cache.delete(lock)
+    if cache.add(lock, 1, FILL_LOCK_TIMEOUT):
+        try:
+            return _fill(cache, key, compute, timeout, grace)
+        finally:
+            cache.delete(lock)
+    deadline = time.monotonic() + FILL_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(FILL_WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return _fill(cache, key, compute, timeout, grace)
@@ -0,0 +1,47 @@
+import logging
+
+from django.conf import settings
+
+from . import routers
+
+logger = logging.getLogger('core.routers')
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Ведёт состояние роутера реплик (core/routers.py) на запрос.
+
+    После записи ставит куку, с которой следующие запросы пользователя
+    REPLICA_PIN_SECONDS читают из default. Решения роутера пишутся в
+    лог core.routers, лежат в request.db_routing, а при DEBUG
+    отдаются заголовком X-DB-Route. Должен стоять первым в MIDDLEWARE,
+    чтобы видеть и запись сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.db_routing = routers.begin(
+            pinned=(
+                PIN_COOKIE in request.COOKIES
+                or request.method not in SAFE_METHODS
+            )
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            state = routers.end()
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        logger.debug('%s %s: %s', request.method, request.path, state)
+        if settings.DEBUG:
+            response['X-DB-Route'] = str(state)
+        return response
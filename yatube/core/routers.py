@@ -0,0 +1,93 @@
+"""Чтение с реплик, запись - в основную базу (default).
+
+Реплики - псевдонимы из settings.DATABASE_REPLICAS; локально это могут
+быть копии файла SQLite. Пока список пуст, всё идёт в default.
+
+Запрос читает с одной случайной реплики, чтобы его чтения были
+согласованы между собой. Запросы, которые пишут, и все запросы
+пользователя в течение REPLICA_PIN_SECONDS после записи читают из
+default: так автор сразу видит свой пост, комментарий или подписку,
+даже если реплика отстаёт. Состояние запроса ведёт
+core.middleware.ReplicaRoutingMiddleware.
+"""
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+class RoutingState:
+    """Решения роутера за один запрос."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+        self.reads = Counter()
+        self.writes = 0
+
+    def __str__(self):
+        parts = ['pinned' if self.pinned else 'replica']
+        parts += [f'{alias}={count}' for alias, count in self.reads.items()]
+        if self.writes:
+            parts.append(f'writes={self.writes}')
+        return '; '.join(parts)
+
+
+def begin(pinned=False):
+    _state.current = RoutingState(pinned)
+    return _state.current
+
+
+def end():
+    state = current()
+    _state.current = None
+    return state
+
+
+def current():
+    return getattr(_state, 'current', None)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current()
+        alias = self.choose(state)
+        if state is not None:
+            state.reads[alias] += 1
+        return alias
+
+    def choose(self, state):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or (state is not None and state.pinned)
+            # Внутри транзакции читаем то, что она сама записала.
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        if state is None:
+            return random.choice(replicas)
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current()
+        if state is not None:
+            state.wrote = state.pinned = True
+            state.writes += 1
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты с разных псевдонимов те же.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
@@ -0,0 +1,46 @@
+"""Настройка каждого нового соединения с SQLite.
+
+PRAGMA из settings.SQLITE_PRAGMAS выполняются на сигнал
+connection_created, то есть один раз на соединение; вместе с
+CONN_MAX_AGE соединение и его настройки живут дольше одного запроса.
+WAL даёт читателям не ждать писателя, а busy_timeout заставляет
+писателей ждать друг друга, а не падать с "database is locked".
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Только эти PRAGMA можно задать настройкой: имя подставляется в SQL.
+PRAGMAS = (
+    'journal_mode',
+    'synchronous',
+    'busy_timeout',
+    'mmap_size',
+    'cache_size',
+    'temp_store',
+)
+
+
+def pragma_statements(pragmas, in_memory=False):
+    statements = []
+    for name, value in pragmas.items():
+        if name not in PRAGMAS:
+            raise ValueError(f'Неизвестная PRAGMA в SQLITE_PRAGMAS: {name}')
+        if in_memory and name in ('journal_mode', 'mmap_size'):
+            # У базы в памяти нет файла: ни журнала, ни mmap.
+            continue
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    # Через соединение sqlite3, а не курсор Django: не попадает в
+    # connection.queries и assertNumQueries.
+    for statement in pragma_statements(
+        pragmas, connection.is_in_memory_db()
+    ):
+        connection.connection.execute(statement)
@@ -0,0 +1,83 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.auth import USER_KEY
+from posts.models import User
+
+AUTH_TABLES = ('FROM "django_session"', 'FROM "auth_user"')
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader',
+                                             password='secret')
+        self.client = Client()
+        self.client.login(username='reader', password='secret')
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in queries
+            if any(table in query['sql'] for table in AUTH_TABLES)
+        ]
+
+    def test_feed_makes_no_session_or_user_queries(self):
+        url = reverse('post:follow_index')
+        self.auth_queries(url)
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_user_edit_is_visible_immediately(self):
+        url = reverse('post:follow_index')
+        self.auth_queries(url)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.assertEqual(len(self.auth_queries(url)), 1)
+        response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.user.first_name, 'Новое')
+
+    def test_password_change_ends_other_sessions(self):
+        url = reverse('post:follow_index')
+        self.client.get(url)
+        self.user.set_password('changed')
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_sessions_of_plain_model_backend_stay_valid(self):
+        """Сессии, начатые до CachedModelBackend, не разлогиниваются."""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = client.get(reverse('post:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+
+    def test_password_hash_not_cached(self):
+        url = reverse('post:follow_index')
+        self.client.get(url)
+        cached = caches['shared'].get(USER_KEY.format(self.user.pk))
+        self.assertNotIn(self.user.password, repr(cached))
+        user = self.client.get(url).wsgi_request.user
+        self.assertTrue(user.check_password('secret'))
+        user.first_name = 'Новое'
+        user.save()
+        self.assertTrue(
+            User.objects.get(pk=self.user.pk).check_password('secret')
+        )
+
+    def test_logout_drops_cached_session_and_user(self):
+        self.client.get(reverse('post:follow_index'))
+        session = self.client.session
+        shared = caches['shared']
+        self.assertTrue(shared.has_key(session.cache_key))
+        self.assertTrue(shared.has_key(USER_KEY.format(self.user.pk)))
+        self.client.get(reverse('users:logout'))
+        self.assertFalse(shared.has_key(session.cache_key))
+        self.assertFalse(shared.has_key(USER_KEY.format(self.user.pk)))
@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import SQLiteCache, get_or_fill
+from posts.models import Post, User
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'tiered-test',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 3},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-test-shared',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_second_read_is_local(self):
+        self.cache.set('key', 'value')
+        self.shared.set('key', 'changed elsewhere')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['local'], {'hits': 1, 'misses': 0})
+
+    def test_miss_falls_through_to_shared(self):
+        self.shared.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.stats(), {
+            'local': {'hits': 1, 'misses': 2},
+            'shared': {'hits': 1, 'misses': 1},
+        })
+
+    def test_versions_invalidate_local_entries(self):
+        self.cache.set('key', 'old')
+        self.cache.incr_version('key')
+        self.assertEqual(self.cache.get('key', version=2), 'old')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_delete_and_size_limit(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3, 'd': 4})
+        self.cache.delete('d')
+        self.assertIsNone(self.cache.get('d'))
+        self.shared.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'b': 2, 'c': 3})
+
+    def test_many_and_get_or_set_go_to_shared_once(self):
+        with mock.patch.object(
+            self.shared, 'set_many', wraps=self.shared.set_many
+        ) as set_many, mock.patch.object(
+            self.cache, 'set', wraps=self.cache.set
+        ) as set_one:
+            self.cache.set_many({'a': 1, 'b': 2})
+        set_many.assert_called_once()
+        set_one.assert_not_called()
+        self.shared.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+
+        self.assertEqual(self.cache.get_or_set('c', lambda: 3), 3)
+        self.assertEqual(self.shared.get('c'), 3)
+        self.shared.set('c', 'changed elsewhere')
+        self.assertEqual(self.cache.get_or_set('c', 4), 3)
+
+    def test_touch_expires_local_entry(self):
+        self.cache.set('key', 'value')
+        self.assertTrue(self.cache.touch('key', 0))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.touch('missing'))
+
+    def test_mutable_values_are_copied(self):
+        self.cache.set('key', {'items': [1]})
+        self.cache.get('key')['items'].append(2)
+        self.assertEqual(self.cache.get('key'), {'items': [1]})
+
+    def test_index_fragment_served_from_memory(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        client = Client()
+        client.get(reverse('post:main'))
+        self.cache.reset_stats()
+        response = client.get(reverse('post:main'))
+        self.assertContains(response, 'Пост')
+        stats = self.cache.stats()
+        self.assertEqual(stats['local']['misses'], 0)
+        self.assertGreater(stats['local']['hits'], 0)
+
+
+class GetOrFillTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache('get-or-fill-test', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'значение {self.calls}'
+
+    def fill(self, compute=None, **kwargs):
+        return get_or_fill(
+            'key', compute or self.compute, 60, cache=self.cache, **kwargs
+        )
+
+    def expire(self, duration=0.0):
+        value, _, _ = self.cache.get('key')
+        self.cache.set('key', (value, duration, time.time() - 1))
+
+    def test_fresh_value_is_computed_once(self):
+        self.assertEqual(self.fill(), 'значение 1')
+        self.assertEqual(self.fill(), 'значение 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        self.fill()
+        self.expire()
+        self.cache.add('key:fill-lock', 1)
+        self.assertEqual(self.fill(), 'значение 1')
+        self.assertEqual(self.calls, 1)
+        self.cache.delete('key:fill-lock')
+        self.assertEqual(self.fill(), 'значение 2')
+
+    def test_early_recomputation(self):
+        self.fill()
+        value, _, expires = self.cache.get('key')
+        self.cache.set('key', (value, 10.0, expires))
+        with mock.patch('core.cache.random.random', return_value=0.0):
+            self.assertEqual(self.fill(), 'значение 1')
+        with mock.patch('core.cache.random.random', return_value=0.999):
+            self.assertEqual(self.fill(), 'значение 2')
+
+    def test_stale_value_served_when_database_fails(self):
+        def broken():
+            raise DatabaseError('database is locked')
+
+        self.fill()
+        self.expire()
+        with self.assertLogs('core.cache', 'WARNING'):
+            self.assertEqual(self.fill(broken), 'значение 1')
+        self.cache.clear()
+        with self.assertRaises(DatabaseError):
+            self.fill(broken)
+
+    def test_cold_miss_waits_for_lock_holder(self):
+        self.cache.add('key:fill-lock', 1)
+
+        def other_worker_fills(seconds):
+            self.cache.set('key', ('чужое', 0.0, time.time() + 60))
+
+        with mock.patch('core.cache.time.sleep', other_worker_fills):
+            self.assertEqual(self.fill(), 'чужое')
+        self.assertEqual(self.calls, 0)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        self.cache = SQLiteCache(
+            os.path.join(workdir, 'cache', 'cache.sqlite3'),
+            {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}},
+        )
+
+    def test_roundtrip_and_expiry(self):
+        self.cache.set('key', {'items': [1]})
+        self.cache.set('forever', 'value', timeout=None)
+        self.cache.set('gone', 'value', timeout=-1)
+        self.assertEqual(self.cache.get('key'), {'items': [1]})
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertFalse(self.cache.has_key('gone'))
+        self.cache.delete('key')
+        self.assertEqual(self.cache.get('key', 'нет'), 'нет')
+
+    def test_add_replaces_only_expired_entries(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+        self.cache.touch('key', -1)
+        self.assertTrue(self.cache.add('key', 3))
+        self.assertEqual(self.cache.get('key'), 3)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.decr('counter', 5), -3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(self.cache.get_many(['a', 'c', 'x']),
+                         {'a': 1, 'c': 3})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_cull_evicts_soonest_expiring_entries(self):
+        self.cache.CULL_EVERY = 1
+        self.cache.set('expired', 0, timeout=-1)
+        for number in range(11):
+            self.cache.set(number, number, timeout=100 + number)
+        self.assertEqual(
+            self.cache.get_many(range(11)),
+            {number: number for number in range(5, 11)},
+        )
+        count = self.cache.connection.execute(
+            'SELECT count(*) FROM cache'
+        ).fetchone()[0]
+        self.assertEqual(count, 6)
@@ -0,0 +1,65 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DEBUG=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def request(self, view, method='get', cookies=None):
+        request = getattr(self.factory, method)('/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_reads_stick_to_one_replica(self):
+        def view(request):
+            aliases = {self.router.db_for_read(Post) for _ in range(20)}
+            self.assertEqual(len(aliases), 1)
+            self.assertIn(aliases.pop(), ['replica1', 'replica2'])
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertRegex(response['X-DB-Route'], r'^replica; replica\d=20$')
+
+    def test_write_pins_request_and_next_requests(self):
+        def view(request):
+            self.assertNotEqual(self.router.db_for_read(Post), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+        def next_view(request):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            return HttpResponse()
+
+        response = self.request(next_view, cookies={PIN_COOKIE: '1'})
+        self.assertEqual(response['X-DB-Route'], 'pinned; default=1')
+
+    def test_unsafe_methods_read_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            return HttpResponse()
+
+        self.request(view, method='post')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            return HttpResponse()
+
+        self.request(view)
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from core.sqlite import pragma_statements
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    def file_connection(self, path):
+        connection = connections['default']
+        settings_dict = dict(connection.settings_dict, NAME=path)
+        wrapper = type(connection)(settings_dict, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'wal',
+        'busy_timeout': 1234,
+        'cache_size': -2048,
+    })
+    def test_new_connection_gets_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = self.file_connection(os.path.join(directory, 'db'))
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+            self.assertEqual(self.pragma(wrapper, 'cache_size'), -2048)
+
+    def test_unknown_pragma_is_rejected(self):
+        with self.assertRaises(ValueError):
+            pragma_statements({'writable_schema': 'on'})
+
+    def test_in_memory_database_skips_file_pragmas(self):
+        self.assertEqual(
+            pragma_statements(
+                {'journal_mode': 'wal', 'mmap_size': 1, 'busy_timeout': 5},
+                in_memory=True,
+            ),
+            ['PRAGMA busy_timeout = 5'],
+        )
@@ -1,9 +1,71 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from . import search
 from .models import Group, Post, Comment, Follow
+from .paginators import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которому выбранный объект передаёт форма.
+
+    Обычный AutocompleteSelect ищет подпись выбранного значения
+    отдельным запросом, то есть по запросу на строку list_editable.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or [str(v) for v in value] != [str(selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        label = self.choices.field.label_from_instance(selected)
+        options.append(
+            self.create_option(name, selected.pk, label, True, len(options))
+        )
+        return [(None, options, 0)]
+
+
+class PreloadedRelationsForm(forms.ModelForm):
+    """Отдаёт виджетам автодополнения уже загруженные связанные объекты."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is None:
+            return
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect):
+                widget.selected = getattr(self.instance, name)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка таблиц на миллионы строк.
+
+    Внешние ключи выбираются автодополнением, а список не считает
+    COUNT(*) всей таблицы на каждой странице.
+    """
+    form = PreloadedRelationsForm
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', self.form)
+        return super().get_changelist_form(request, **kwargs)
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -14,8 +76,20 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_editable = ('group',)
     list_filter = ('pub_date',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу FTS5 вместо LIKE '%...%' по всей таблице,
+        # в том числе в автодополнении поста у комментариев.
+        terms = search.search_terms(search_term)
+        if not terms or not search.is_supported():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.filter_posts(queryset, terms), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -23,22 +97,27 @@ class GroupAdmin(admin.ModelAdmin):
         'slug',
         'description',
     )
+    search_fields = ('title', 'slug')
     prepopulated_fields = {"title": ("slug",)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'post',
         'author',
         'created',
     )
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = (
         'user',
         'author',
     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,194 @@
+"""JSON API лент и постов только для чтения (/api/...).
+
+Ленты пагинируются курсорами (?after= / ?before=, как и HTML-ленты).
+Страница собирается двумя запросами: ключи страницы читаются по
+индексу ленты, а поля постов - одним запросом values() по этим id, без
+создания моделей и без запросов на каждую строку. ?fields=id,text
+оставляет в ответе (и в SELECT) только нужные поля, ?ids=1,2,3 отдаёт
+несколько постов одним запросом.
+"""
+from functools import wraps
+
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from . import thumbnails
+from .models import Group, Post, TimelineEntry, User
+from .paginators import FEED_ORDERING, CursorPaginator, InvalidCursor
+from .timeline import TIMELINE_ORDERING, pull_authors
+
+AMOUNT_POST = 10
+MAX_IDS = 100
+THUMBNAIL_SIZE = 'card'
+# Поле ответа -> поле для values().
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'thumbnail': 'image',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_view(view):
+    """Отдаёт результат view и ошибки (ApiError, 404) в JSON."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return json_response(view(request, *args, **kwargs))
+        except ApiError as error:
+            return json_response({'error': str(error)}, error.status)
+        except Http404:
+            return json_response({'error': 'Не найдено'}, 404)
+    return wrapper
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def requested_ids(request):
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise ApiError('ids - список чисел через запятую')
+    if len(ids) > MAX_IDS:
+        raise ApiError(f'Не больше {MAX_IDS} ids за запрос')
+    return ids
+
+
+def serialize(ids, fields):
+    """Посты с данными id в том же порядке, одним запросом."""
+    lookups = {FIELDS[name] for name in fields} | {'id'}
+    rows = {
+        row['id']: row
+        for row in Post.objects.filter(pk__in=ids).order_by()
+        .values(*lookups)
+    }
+    storage = Post._meta.get_field('image').storage
+    ready = {}
+    if 'thumbnail' in fields:
+        ready = thumbnails.resolve(
+            (row['image'] for row in rows.values()), THUMBNAIL_SIZE
+        )
+    posts = []
+    for pk in ids:
+        row = rows.get(pk)
+        if row is None:
+            continue
+        post = {}
+        for name in fields:
+            value = row[FIELDS[name]]
+            if name == 'image':
+                value = storage.url(value) if value else None
+            elif name == 'thumbnail':
+                thumbnail = ready.get(value) if value else None
+                value = thumbnail.url if thumbnail else None
+            post[name] = value
+        posts.append(post)
+    return posts
+
+
+def page_url(request, cursor_name, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[cursor_name] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def feed(request, keys, ordering=FEED_ORDERING, post_key='id'):
+    """Страница ленты; keys - values() с полями ordering."""
+    fields = requested_fields(request)
+    paginator = CursorPaginator(keys, AMOUNT_POST, ordering)
+    try:
+        page = paginator.page(
+            after=request.GET.get('after') or None,
+            before=request.GET.get('before') or None,
+        )
+    except InvalidCursor:
+        raise ApiError('Неверный курсор')
+    return {
+        'results': serialize([row[post_key] for row in page], fields),
+        'next': page_url(request, 'after', page.next_cursor),
+        'previous': page_url(request, 'before', page.previous_cursor),
+    }
+
+
+def post_keys(queryset):
+    return queryset.values('id', 'pub_date')
+
+
+@api_view
+def index(request):
+    if 'ids' in request.GET:
+        return {
+            'results': serialize(
+                requested_ids(request), requested_fields(request)
+            ),
+        }
+    return feed(request, post_keys(Post.objects.all()))
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed(request, post_keys(Post.objects.filter(group=group)))
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed(request, post_keys(author.posts.all()))
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    pulled = pull_authors(request.user)
+    entries = TimelineEntry.objects.filter(user=request.user)
+    if pulled:
+        # Как и timeline.feed_page: посты авторов без раскладки
+        # подмешиваются во время чтения.
+        return feed(request, post_keys(Post.objects.filter(
+            Q(pk__in=entries.values('post')) | Q(author__in=pulled)
+        )))
+    return feed(
+        request, entries.values('post_id', 'pub_date'), TIMELINE_ORDERING,
+        post_key='post_id',
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    posts = serialize([post_id], requested_fields(request))
+    if not posts:
+        raise Http404
+    return posts[0]
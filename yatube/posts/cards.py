@@ -0,0 +1,65 @@
+"""Кеш карточек постов в лентах.
+
+Карточка (includes/post_card.html) рендерится одна на пост и размер
+картинки и хранится под ключом из id поста и его updated_at: правка
+поста меняет ключ, и старая карточка просто перестаёт читаться. Лента
+достаёт карточки страницы одним get_many и рендерит только промахи.
+
+Карточка с заглушкой вместо ещё не готовой миниатюры не кешируется.
+Имя автора и группа, которые выводятся на карточке, тоже входят в ключ:
+иначе их правка была бы видна лишь через POST_CARD_CACHE_TIMEOUT, а
+ETag страницы (posts/etags.py) уже сменился бы.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+CARD_KEY = 'posts:card:{}:{}:{}:{}'
+# Классы картинки карточки для каждого размера миниатюры.
+IMAGE_CSS = {
+    'card': 'img-thumbnail rounded float-left my-3',
+    'wide': 'card-img my-2',
+}
+
+
+def card_key(post, size):
+    author = post.author
+    labels = (
+        author.username,
+        author.get_full_name(),
+        post.group.slug if post.group_id else None,
+    )
+    return CARD_KEY.format(
+        post.pk, post.updated_at.timestamp(), size,
+        hashlib.md5(repr(labels).encode()).hexdigest(),
+    )
+
+
+def render_cards(posts, size):
+    """HTML карточек posts в том же порядке."""
+    keys = {card_key(post, size): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = {key: post for key, post in keys.items() if key not in cards}
+    if missing:
+        ready = thumbnails.resolve(
+            (post.image for post in missing.values()), size
+        )
+        page_thumbnails = {
+            (name, size): image for name, image in ready.items()
+        }
+        fresh = {}
+        for key, post in missing.items():
+            cards[key] = render_to_string('includes/post_card.html', {
+                'post': post,
+                'size': size,
+                'css': IMAGE_CSS[size],
+                'page_thumbnails': page_thumbnails,
+            })
+            if not post.image or ready.get(str(post.image)) is not None:
+                fresh[key] = cards[key]
+        cache.set_many(fresh, settings.POST_CARD_CACHE_TIMEOUT)
+    return [cards[key] for key in keys]
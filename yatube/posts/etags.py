@@ -0,0 +1,83 @@
+"""ETag страниц поста, профиля и группы для условных GET.
+
+Валидатор считается одним запросом по индексу, до основного запроса и
+рендеринга, и не читает посты профиля или группы: их меняют поколения
+автора и группы (feed_cache), которые сбрасываются сигналами постов.
+Страница поста берёт свой updated_at и последний комментарий с их
+числом; updated_at меняет и правка поста, и готовая миниатюра
+(posts/thumbnails.py). Поля самих автора и группы читаются той же
+строкой, а подписки читателя учитываются его поколением ленты подписок.
+Если ETag совпал с If-None-Match, view не вызывается и ответ - 304.
+
+То, от чего зависит общее тело страницы, запоминается в
+request.page_version и входит в ключ кеша страниц (posts/page_cache.py):
+иначе новый ETag мог бы уйти со старым телом.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+
+from . import feed_cache
+from .models import Group, Post, User
+
+
+def make_etag(request, *parts, private=()):
+    """ETag страницы из состояния parts и частей читателя private."""
+    request.page_version = parts
+    # Страница зависит от читателя: шапка, форма комментария, подписка.
+    parts = (*parts, *private, request.user.pk)
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def scope_row(queryset, fields, **aggregates):
+    """Поля объекта и агрегаты по его строкам, одним запросом.
+
+    values_list перед annotate группирует только по fields, а
+    order_by() убирает сортировку, которой нужен был бы TEMP B-TREE.
+    """
+    rows = queryset.order_by().values_list(*fields).annotate(**aggregates)
+    return next(iter(rows[:1]), None)
+
+
+def post_detail(request, post_id):
+    # Имя и число постов автора и название группы тоже выводятся на
+    # странице поста.
+    row = scope_row(
+        Post.objects.filter(pk=post_id),
+        ('pk', 'updated_at', 'author__first_name', 'author__last_name',
+         'author__stats__posts_count', 'group__title'),
+        last_comment=Max('comments__created'),
+        comments_count=Count('comments'),
+    )
+    if row is None:
+        return None
+    return make_etag(request, 'post', *row)
+
+
+def profile(request, username):
+    # Число постов - из счётчика автора (posts/stats.py), как и на
+    # самой странице.
+    row = scope_row(
+        User.objects.filter(username=username),
+        ('pk', 'first_name', 'last_name', 'stats__posts_count'),
+    )
+    if row is None:
+        return None
+    following = None
+    if request.user.is_authenticated:
+        following = feed_cache.follow_generation(request.user.pk)
+    return make_etag(
+        request, 'profile', *row, feed_cache.author_generation(row[0]),
+        private=(following,),
+    )
+
+
+def group_posts(request, slug):
+    row = scope_row(
+        Group.objects.filter(slug=slug), ('pk', 'title', 'description')
+    )
+    if row is None:
+        return None
+    return make_etag(
+        request, 'group', *row, feed_cache.group_generation(row[0])
+    )
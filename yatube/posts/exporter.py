@@ -0,0 +1,130 @@
+"""Выгрузка постов, комментариев и подписок (export_yatube, /export/).
+
+Таблицы читаются пачками по первичному ключу (каждая пачка - свой
+короткий запрос), а результат отдаётся генератором кусков, так что
+память не зависит от размера таблиц. NDJSON может содержать сразу
+несколько таблиц: у каждой строки есть поле model. В CSV - ровно одна
+таблица.
+"""
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+# Имя -> (модель, колонки); колонка - поле модели или (имя, путь).
+EXPORTS = {
+    'posts': (Post, (
+        'id', 'text', 'pub_date', ('author', 'author__username'),
+        ('group', 'group__slug'), 'image',
+    )),
+    'comments': (Comment, (
+        'id', 'post_id', ('author', 'author__username'), 'text', 'created',
+    )),
+    'follows': (Follow, (
+        'id', ('user', 'user__username'), ('author', 'author__username'),
+    )),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CHUNK_SIZE = 2000
+
+
+class ExportError(ValueError):
+    pass
+
+
+def check(models, export_format):
+    unknown = set(models) - EXPORTS.keys()
+    if unknown:
+        raise ExportError(f'Неизвестные таблицы: {", ".join(unknown)}')
+    if export_format not in FORMATS:
+        raise ExportError(f'Неизвестный формат: {export_format}')
+    if export_format == 'csv' and len(models) != 1:
+        raise ExportError('В CSV выгружается ровно одна таблица')
+
+
+def columns(name):
+    _, fields = EXPORTS[name]
+    return [field if isinstance(field, str) else field[0] for field in fields]
+
+
+def iterate_rows(name, chunk_size=CHUNK_SIZE):
+    """Строки таблицы словарями, пачками по возрастанию id."""
+    model, fields = EXPORTS[name]
+    lookups = [field if isinstance(field, str) else field[1]
+               for field in fields]
+    queryset = model.objects.order_by('pk').values_list(*lookups)
+    names = columns(name)
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield dict(zip(names, row))
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def ndjson_chunks(models, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for name in models:
+        lines = []
+        for row in iterate_rows(name, chunk_size):
+            row['model'] = name
+            lines.append(encoder.encode(row))
+            if len(lines) >= chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+
+def csv_chunks(name, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns(name))
+    writer.writeheader()
+    for number, row in enumerate(iterate_rows(name, chunk_size), start=1):
+        writer.writerow(row)
+        if number % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(models, export_format='ndjson', gzip=False,
+                  chunk_size=CHUNK_SIZE):
+    """Куски выгрузки в байтах: их можно писать в файл или в ответ."""
+    check(models, export_format)
+    if export_format == 'csv':
+        chunks = csv_chunks(models[0], chunk_size)
+    else:
+        chunks = ndjson_chunks(models, chunk_size)
+    chunks = (chunk.encode() for chunk in chunks)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def filename(models, export_format, gzip=False):
+    name = f'yatube-{"-".join(models)}.{export_format}'
+    return name + '.gz' if gzip else name
+
+
+def content_type(export_format, gzip=False):
+    return 'application/gzip' if gzip else FORMATS[export_format]
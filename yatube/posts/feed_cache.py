@@ -0,0 +1,94 @@
+"""Ключи кеша лент (posts/page_cache.py).
+
+Ключ ленты включает тип ленты, страницу или курсор, для ленты
+подписок - пользователя, и поколение ленты. Шапка и прочее под
+пользователя - метки {% page_hole %}, поэтому тело одно для всех.
+Поколение увеличивается при каждом изменении постов, поэтому старые
+страницы просто перестают читаться и доживают свой таймаут.
+
+Поколения автора и группы меняются только с их постами: по ним без
+запросов к постам считаются ETag их страниц (posts/etags.py).
+"""
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'posts:feed:generation'
+FOLLOW_GENERATION_KEY = 'posts:follow:generation:{}'
+AUTHOR_GENERATION_KEY = 'posts:author:generation:{}'
+GROUP_GENERATION_KEY = 'posts:group:generation:{}'
+
+
+def _counters():
+    # Поколения версионируют ключи лент и страниц, поэтому читаются из
+    # общего кеша мимо LRU процесса (core/cache.py): иначе другие
+    # процессы увидели бы новый пост лишь через LOCAL_TIMEOUT.
+    return getattr(cache, 'shared', cache)
+
+
+def _generation(key):
+    counters = _counters()
+    value = counters.get(key)
+    if value is None:
+        # Время, а не 1: после вытеснения из кеша поколение не повторится.
+        counters.add(key, time.time_ns(), None)
+        value = counters.get(key)
+    return value
+
+
+def _bump(key):
+    counters = _counters()
+    try:
+        counters.incr(key)
+    except ValueError:
+        counters.set(key, time.time_ns(), None)
+
+
+def feed_generation():
+    return _generation(GENERATION_KEY)
+
+
+def follow_generation(user_id):
+    return _generation(FOLLOW_GENERATION_KEY.format(user_id))
+
+
+def author_generation(user_id):
+    return _generation(AUTHOR_GENERATION_KEY.format(user_id))
+
+
+def group_generation(group_id):
+    return _generation(GROUP_GENERATION_KEY.format(group_id))
+
+
+def bump_feed_generation():
+    _bump(GENERATION_KEY)
+
+
+def bump_follow_generation(user_id):
+    _bump(FOLLOW_GENERATION_KEY.format(user_id))
+
+
+def bump_post_generations(author_ids, group_ids):
+    """Сбрасывает поколения авторов и групп изменившихся постов."""
+    for author_id in set(author_ids):
+        _bump(AUTHOR_GENERATION_KEY.format(author_id))
+    for group_id in set(group_ids) - {None}:
+        _bump(GROUP_GENERATION_KEY.format(group_id))
+
+
+def feed_key(request, feed):
+    """Ключ ленты feed для текущего запроса."""
+    user = request.user
+    parts = [
+        feed,
+        feed_generation(),
+        request.GET.get('page', ''),
+        request.GET.get('after', ''),
+        request.GET.get('before', ''),
+    ]
+    if feed == 'follow':
+        parts += [
+            user.pk,
+            follow_generation(user.pk),
+        ]
+    return ':'.join(str(part) for part in parts)
@@ -0,0 +1,184 @@
+"""RSS и Atom: лента сайта, группы и автора.
+
+Лента рендерится один раз на изменение и лежит в кеше целиком, с
+датой рендеринга для Last-Modified и ETag, так что опрос ленты - это одно
+чтение из кеша и ни одного запроса к базе. В ссылках ленты - схема и
+хост запроса, поэтому они входят в ключ. Область ленты адресуется так
+же, как URL (slug группы, username автора), и у неё есть версия в
+ключе; версия меняется при создании, правке и удалении поста в этой
+области и правке группы (posts/signals.py, импорт).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils import feedgenerator, timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Group, Post, User
+from .paginators import FEED_ORDERING
+
+FEED_TYPES = {
+    'rss': feedgenerator.Rss201rev2Feed,
+    'atom': feedgenerator.Atom1Feed,
+}
+FEED_ITEMS = 20
+CACHE_KEY = (
+    'posts:syndication:{scope}:{name}:{version}:{origin}:{feed_format}'
+)
+VERSION_KEY = 'posts:syndication:version:{scope}:{name}'
+
+
+class PostsFeed(Feed):
+    """Последние посты области; подклассы задают область."""
+    scope = 'site'
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def __init__(self, feed_format):
+        super().__init__()
+        self.feed_type = FEED_TYPES[feed_format]
+
+    def link(self):
+        return reverse('post:main')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).feed().order_by(*FEED_ORDERING)[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 50)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('post:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+
+class GroupFeed(PostsFeed):
+    scope = 'group'
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('post:group', args=[obj.slug])
+
+    def posts(self, obj):
+        return Post.objects.filter(group=obj)
+
+
+class ProfileFeed(PostsFeed):
+    scope = 'profile'
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('post:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return Post.objects.filter(author=obj)
+
+
+def _versions():
+    # Версии читаются из общего кеша мимо LRU процесса, как поколения
+    # лент (posts/feed_cache.py).
+    return getattr(cache, 'shared', cache)
+
+
+def scope_version(scope, name):
+    versions = _versions()
+    key = VERSION_KEY.format(scope=scope, name=name)
+    value = versions.get(key)
+    if value is None:
+        versions.add(key, time.time_ns(), None)
+        value = versions.get(key)
+    return value
+
+
+def cache_key(request, scope, name, feed_format):
+    return CACHE_KEY.format(
+        scope=scope,
+        name=name,
+        version=scope_version(scope, name),
+        origin=f'{request.scheme}://{request.get_host()}',
+        feed_format=feed_format,
+    )
+
+
+def cached_feed(feed_class):
+    """View ленты feed_class, отдающая её из кеша."""
+    def view(request, feed_format, **kwargs):
+        if feed_format not in FEED_TYPES:
+            raise Http404
+        name = next(iter(kwargs.values()), '')
+        key = cache_key(request, feed_class.scope, name, feed_format)
+        cached = cache.get(key)
+        if cached is None:
+            rendered = feed_class(feed_format)(request, **kwargs)
+            cached = (
+                rendered.content,
+                rendered['Content-Type'],
+                int(timezone.now().timestamp()),
+                # Last-Modified точен до секунды, ETag различает и
+                # рендеры одной секунды.
+                quote_etag(hashlib.md5(rendered.content).hexdigest()),
+            )
+            cache.set(key, cached, settings.SYNDICATION_CACHE_TIMEOUT)
+        content, content_type, last_modified, etag = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['Last-Modified'] = http_date(last_modified)
+        response['ETag'] = etag
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+            response=response,
+        )
+    return view
+
+
+def invalidate(authors=(), groups=()):
+    """Сбрасывает ленту сайта и ленты данных авторов и групп."""
+    version = time.time_ns()
+    versions = {}
+    for scope, names in (
+        ('site', ['']), ('profile', authors), ('group', groups)
+    ):
+        versions.update({
+            VERSION_KEY.format(scope=scope, name=name): version
+            for name in names if name is not None
+        })
+    _versions().set_many(versions, None)
+
+
+site_feed = cached_feed(PostsFeed)
+group_feed = cached_feed(GroupFeed)
+profile_feed = cached_feed(ProfileFeed)
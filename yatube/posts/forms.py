@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Post, Comment
+from .models import Post, Comment, Group, User
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +10,19 @@ class PostForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['group'].empty_label = 'Категория не выбрана'
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not image:
+            # Картинку убрали: вместе с ней сбрасываются и размеры.
+            self.instance.image_width = self.instance.image_height = None
+            return image
+        if not isinstance(image, UploadedFile):
+            return image
+        image, width, height = process_image(image)
+        self.instance.image_width = width
+        self.instance.image_height = height
+        return image
+
     class Meta:
         model = Post
         fields = ['text', 'group', 'image']
@@ -33,3 +48,24 @@ class CommentForm(forms.ModelForm):
         help_text = {
             'text': 'Пиши все,что думаешь про автора',
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Что ищем', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.order_by('title'),
+        label='Группа',
+        empty_label='Все группы',
+        to_field_name='slug',
+        required=False,
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise forms.ValidationError('Такого автора нет.')
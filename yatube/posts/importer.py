@@ -0,0 +1,271 @@
+"""Массовый импорт постов из JSONL или CSV (команда import_posts).
+
+Файл читается построчно, посты пишутся bulk_create пачками, каждая
+пачка - в своей транзакции вместе с контрольной точкой
+(ImportCheckpoint), так что прерванный импорт продолжается с первой
+незаписанной строки. Память не зависит от размера файла: в ней
+только текущая пачка и LRU авторов.
+
+Строка источника - объект с полями text, author (username), group
+(slug, необязательно) и pub_date (ISO 8601, необязательно).
+
+bulk_create не отправляет сигналы, поэтому то, что делают
+posts/signals.py - счётчики, ленты подписок, поколение кэша лент,
+кеш RSS, - импорт делает сам, по пачке за раз. Поисковый индекс
+обновляют триггеры.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.lru import LRU
+
+from . import feed_cache, feeds, stats, timeline
+from .models import Group, ImportCheckpoint, Post, User
+
+AUTHOR_CACHE_SIZE = 100000
+# Сколько ошибок запоминать для отчёта; остальные только считаются.
+MAX_ERRORS = 20
+FORMATS = ('jsonl', 'csv')
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def parse_json(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return RowError('неверный JSON')
+
+
+def read_rows(path, source_format):
+    """Строки источника по одной: (номер строки, словарь полей)."""
+    with open(path, encoding='utf-8', newline='') as source:
+        if source_format == 'csv':
+            rows = csv.DictReader(source)
+        else:
+            rows = (parse_json(line) for line in source)
+        yield from enumerate(rows, start=1)
+
+
+def parse_pub_date(value):
+    if not value:
+        return timezone.now()
+    try:
+        # Несуществующая дата (30 февраля) - ValueError, не строка -
+        # TypeError.
+        pub_date = parse_datetime(value)
+    except (ValueError, TypeError):
+        pub_date = None
+    if pub_date is None:
+        raise RowError(f'неверная дата {value!r}')
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date)
+    return pub_date
+
+
+def insert_posts(posts):
+    """Вставляет посты пачки с pub_date из источника и заполняет их id.
+
+    auto_now_add затирает дату при вставке, поэтому она записывается
+    вторым запросом. bulk_create на SQLite не заполняет id: строки
+    получают их подряд после последнего. Зовётся в транзакции, уже
+    начавшей запись: на SQLite она держит блокировку записи, и чужих
+    строк между чтением последнего id и вставкой не бывает.
+    """
+    pub_dates = [post.pub_date for post in posts]
+    last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+    Post.objects.bulk_create(posts)
+    if posts and posts[0].pk is None:
+        ids = Post.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+            'pk', flat=True
+        )[:len(posts)]
+        for post, pk in zip(posts, ids):
+            post.pk = pk
+    for post, pub_date in zip(posts, pub_dates):
+        post.pub_date = pub_date
+    Post.objects.bulk_update(posts, ['pub_date'])
+
+
+class AuthorResolver:
+    """username -> id: один запрос на пачку, недавние - из LRU."""
+
+    def __init__(self, create=False):
+        self.create = create
+        self.cache = LRU(AUTHOR_CACHE_SIZE)
+
+    def resolve(self, usernames):
+        ids = {}
+        missing = set()
+        for username in usernames:
+            user_id = self.cache.get(username)
+            if user_id is None:
+                missing.add(username)
+            else:
+                ids[username] = user_id
+        if not missing:
+            return ids
+        found = dict(
+            User.objects.filter(username__in=missing)
+            .values_list('username', 'id')
+        )
+        if self.create and len(found) < len(missing):
+            User.objects.bulk_create(
+                [
+                    User(username=username, password=make_password(None))
+                    for username in missing - found.keys()
+                ],
+                ignore_conflicts=True,
+            )
+            found = dict(
+                User.objects.filter(username__in=missing)
+                .values_list('username', 'id')
+            )
+        for username, user_id in found.items():
+            self.cache.set(username, user_id)
+        ids.update(found)
+        return ids
+
+
+class Importer:
+    """Импорт одного файла; run() продолжает с контрольной точки."""
+
+    def __init__(self, path, source_format=None, batch_size=1000,
+                 checkpoint=None, create_authors=False):
+        self.path = path
+        self.source_format = source_format or detect_format(path)
+        self.batch_size = batch_size
+        self.source = checkpoint or os.path.abspath(path)
+        self.authors = AuthorResolver(create=create_authors)
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def position(self):
+        checkpoint = ImportCheckpoint.objects.filter(
+            source=self.source
+        ).first()
+        return checkpoint.position if checkpoint else 0
+
+    def reset(self):
+        ImportCheckpoint.objects.filter(source=self.source).delete()
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.imported / elapsed if elapsed else 0
+
+    def run(self, progress=None):
+        """Импортирует файл; progress(importer) зовётся после пачки."""
+        start = self.position
+        batch = []
+        for number, row in read_rows(self.path, self.source_format):
+            if number <= start:
+                continue
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+                if progress:
+                    progress(self)
+        if batch:
+            self.write(batch)
+            if progress:
+                progress(self)
+
+    def make_post(self, row, authors):
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError('строка не является объектом')
+        text = row.get('text') or ''
+        if not isinstance(text, str):
+            raise RowError('текст не является строкой')
+        text = text.strip()
+        if not text:
+            raise RowError('пустой текст')
+        author = row.get('author')
+        author_id = authors.get(author) if isinstance(author, str) else None
+        if author_id is None:
+            raise RowError(f'нет автора {author!r}')
+        group_id = None
+        if row.get('group'):
+            if isinstance(row['group'], str):
+                group_id = self.groups.get(row['group'])
+            if group_id is None:
+                raise RowError(f'нет группы {row["group"]!r}')
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=parse_pub_date(row.get('pub_date')),
+        )
+
+    def build(self, batch):
+        """Посты пачки; строки с ошибками пропускаются и считаются."""
+        authors = self.authors.resolve({
+            row['author'] for _, row in batch
+            if isinstance(row, dict) and isinstance(row.get('author'), str)
+        })
+        posts = []
+        for number, row in batch:
+            try:
+                posts.append(self.make_post(row, authors))
+            except RowError as error:
+                self.skipped += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append((number, str(error)))
+        return posts
+
+    def write(self, batch):
+        posts = self.build(batch)
+        with transaction.atomic():
+            # Контрольная точка пишется первой: с первой записью
+            # транзакция SQLite берёт блокировку записи (insert_posts).
+            updated = ImportCheckpoint.objects.filter(
+                source=self.source
+            ).update(position=batch[-1][0])
+            if not updated:
+                ImportCheckpoint.objects.create(
+                    source=self.source, position=batch[-1][0]
+                )
+            insert_posts(posts)
+            stats.bump_many(
+                'posts_count', Counter(post.author_id for post in posts)
+            )
+            timeline.fan_out_many(
+                Post.objects.filter(pk__in=[post.pk for post in posts])
+            )
+        self.imported += len(posts)
+        feed_cache.bump_feed_generation()
+        feed_cache.bump_post_generations(
+            [post.author_id for post in posts],
+            [post.group_id for post in posts],
+        )
+        rows = [row for _, row in batch if isinstance(row, dict)]
+        feeds.invalidate(
+            authors={
+                row['author'] for row in rows
+                if isinstance(row.get('author'), str)
+            },
+            groups={
+                row['group'] for row in rows
+                if isinstance(row.get('group'), str)
+            },
+        )
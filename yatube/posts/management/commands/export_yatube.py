@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporter import (CHUNK_SIZE, EXPORTS, FORMATS, ExportError,
+                            export_chunks)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            help='Какие таблицы выгружать (%s), по умолчанию - все' % (
+                ', '.join(EXPORTS)
+            ),
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать выгрузку gzip',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл выгрузки, по умолчанию - stdout',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк читать одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        models = options['models'] or list(EXPORTS)
+        try:
+            chunks = export_chunks(
+                models, options['format'], options['gzip'],
+                options['chunk_size'],
+            )
+            if options['output'] == '-':
+                self.write(chunks, sys.stdout.buffer)
+            else:
+                with open(options['output'], 'wb') as output:
+                    self.write(chunks, output)
+        except ExportError as error:
+            raise CommandError(error)
+
+    def write(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок существующих постов'
+
+    def handle(self, *args, **options):
+        images = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .iterator()
+        )
+        total = 0
+        for total, image in enumerate(images, start=1):
+            generate(image)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {total}')
+        )
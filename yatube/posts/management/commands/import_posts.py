@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import FORMATS, Importer
+
+
+class Command(BaseCommand):
+    help = 'Импортирует посты из файла JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла, по умолчанию - по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов записывать одной транзакцией',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя контрольной точки, по умолчанию - путь к файлу',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, забыв контрольную точку',
+        )
+        parser.add_argument(
+            '--create-authors',
+            action='store_true',
+            help='Создавать неизвестных авторов без пароля',
+        )
+        parser.add_argument(
+            '--report-every',
+            type=float,
+            default=5,
+            help='Как часто, в секундах, выводить прогресс',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            importer = Importer(
+                options['path'],
+                source_format=options['format'],
+                batch_size=options['batch_size'],
+                checkpoint=options['checkpoint'],
+                create_authors=options['create_authors'],
+            )
+            if options['restart']:
+                importer.reset()
+            elif importer.position:
+                self.stdout.write(
+                    f'Продолжаем после строки {importer.position}'
+                )
+            reported = time.monotonic()
+
+            def progress(importer):
+                nonlocal reported
+                if time.monotonic() - reported < options['report_every']:
+                    return
+                reported = time.monotonic()
+                self.stdout.write(
+                    f'Импортировано {importer.imported}, '
+                    f'пропущено {importer.skipped}, '
+                    f'{importer.rate():.0f} постов/с'
+                )
+
+            importer.run(progress)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        for number, error in importer.errors:
+            self.stderr.write(f'Строка {number}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {importer.imported}, '
+            f'пропущено строк: {importer.skipped}, '
+            f'{importer.rate():.0f} постов/с'
+        ))
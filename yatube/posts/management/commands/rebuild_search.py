@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Поисковый индекс есть только на SQLite')
+        with transaction.atomic():
+            search.install_triggers()
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
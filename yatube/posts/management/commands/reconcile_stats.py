@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько пользователей пересчитывать за один проход',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено записей статистики: {fixed}')
+        )
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counters = {
+        'posts_count': (apps.get_model('posts', 'Post'), 'author'),
+        'followers_count': (apps.get_model('posts', 'Follow'), 'author'),
+        'following_count': (apps.get_model('posts', 'Follow'), 'user'),
+        'comments_count': (apps.get_model('posts', 'Comment'), 'author'),
+    }
+    stats = {}
+    for counter, (model, field) in counters.items():
+        totals = (
+            model.objects.exclude(**{field: None})
+            .values_list(field)
+            .annotate(total=models.Count('pk'))
+            .order_by()
+        )
+        for user_id, total in totals:
+            stats.setdefault(user_id, {})[counter] = total
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(author_id=user_id, **values)
+            for user_id, values in stats.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:41
+
+from django.core.files.images import get_image_dimensions
+from django.db import migrations, models
+
+
+def fill_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = []
+    for post in Post.objects.exclude(image='').only('image').iterator():
+        try:
+            with post.image.open() as image:
+                width, height = get_image_dimensions(image)
+        except (OSError, ValueError):
+            continue
+        if width is None:
+            continue
+        post.image_width, post.image_height = width, height
+        posts.append(post)
+    Post.objects.bulk_update(
+        posts, ['image_width', 'image_height'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,155 @@
+from django.db import migrations
+
+# SQL индекса на момент этой миграции. Он записан здесь, а не взят из
+# posts/search.py: правки модуля не должны менять старую миграцию.
+CREATE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_search USING fts5(
+        text, comments, author, grp,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO posts_post_search(posts_post_search, rank)
+    VALUES ('rank', 'bm25(10.0, 2.0, 0.0, 0.0)')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_insert
+    AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(rowid, text, comments, author, grp)
+        VALUES (
+            new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+            coalesce((
+                SELECT group_concat(
+                    replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+                )
+                FROM posts_comment comment
+                WHERE comment.post_id = new.id
+            ), ''),
+            'u' || new.author_id, coalesce('g' || new.group_id, '')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_update
+    AFTER UPDATE OF text, author_id, group_id ON posts_post
+    BEGIN
+        UPDATE posts_post_search SET
+            text = replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+            author = 'u' || new.author_id,
+            grp = coalesce('g' || new.group_id, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_delete
+    AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_post_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_insert
+    AFTER INSERT ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(
+                replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+            )
+            FROM posts_comment comment
+            WHERE comment.post_id = new.post_id
+        ), '')
+        WHERE rowid = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_update
+    AFTER UPDATE OF text, post_id ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(
+                replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+            )
+            FROM posts_comment comment
+            WHERE comment.post_id = old.post_id
+        ), '')
+        WHERE rowid = old.post_id;
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(
+                replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+            )
+            FROM posts_comment comment
+            WHERE comment.post_id = new.post_id
+        ), '')
+        WHERE rowid = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_delete
+    AFTER DELETE ON posts_comment
+    BEGIN
+        UPDATE posts_post_search SET comments = coalesce((
+            SELECT group_concat(
+                replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+            )
+            FROM posts_comment comment
+            WHERE comment.post_id = old.post_id
+        ), '')
+        WHERE rowid = old.post_id;
+    END
+    """,
+    'DELETE FROM posts_post_search',
+    """
+    INSERT INTO posts_post_search(rowid, text, comments, author, grp)
+    SELECT
+        post.id, replace(replace(post.text, 'ё', 'е'), 'Ё', 'Е'),
+        coalesce((
+            SELECT group_concat(
+                replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'), ' '
+            )
+            FROM posts_comment comment
+            WHERE comment.post_id = post.id
+        ), ''),
+        'u' || post.author_id, coalesce('g' || post.group_id, '')
+    FROM posts_post post
+    """,
+    "INSERT INTO posts_post_search(posts_post_search) VALUES ('optimize')",
+]
+
+DROP_INDEX = [
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_post_search',
+]
+
+
+def execute(schema_editor, statements):
+    # На других СУБД поиск работает без индекса (posts/search.py).
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    execute(schema_editor, CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    execute(schema_editor, DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
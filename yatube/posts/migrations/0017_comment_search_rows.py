@@ -0,0 +1,177 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Комментарии индексируются отдельными строками posts_comment_search, а
+# не склейкой всех комментариев поста в его строке. SQL записан здесь,
+# а не взят из posts/search.py: правки модуля не должны менять старую
+# миграцию.
+DROP_OLD_INDEX = [
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_post_search',
+]
+
+CREATE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_search USING fts5(
+        text, author, grp,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_comment_search USING fts5(
+        text, author, grp, post UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO posts_post_search(posts_post_search, rank)
+    VALUES ('rank', 'bm25(10.0, 0.0, 0.0)')
+    """,
+    """
+    INSERT INTO posts_comment_search(posts_comment_search, rank)
+    VALUES ('rank', 'bm25(2.0, 0.0, 0.0, 0.0)')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_insert
+    AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(rowid, text, author, grp)
+        VALUES (
+            new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+            'u' || new.author_id, coalesce('g' || new.group_id, '')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_update
+    AFTER UPDATE OF text, author_id, group_id ON posts_post
+    BEGIN
+        UPDATE posts_post_search SET
+            text = replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+            author = 'u' || new.author_id,
+            grp = coalesce('g' || new.group_id, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_labels
+    AFTER UPDATE OF author_id, group_id ON posts_post
+    WHEN old.author_id IS NOT new.author_id
+        OR old.group_id IS NOT new.group_id
+    BEGIN
+        UPDATE posts_comment_search SET
+            author = 'u' || new.author_id,
+            grp = coalesce('g' || new.group_id, '')
+        WHERE rowid IN (
+            SELECT id FROM posts_comment WHERE post_id = new.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_delete
+    AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_post_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_insert
+    AFTER INSERT ON posts_comment
+    BEGIN
+    INSERT INTO posts_comment_search(rowid, text, author, grp, post)
+    SELECT
+        new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+        'u' || post.author_id, coalesce('g' || post.group_id, ''), post.id
+    FROM posts_post post
+        WHERE post.id = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_update
+    AFTER UPDATE OF text, post_id ON posts_comment
+    BEGIN
+        DELETE FROM posts_comment_search WHERE rowid = old.id;
+    INSERT INTO posts_comment_search(rowid, text, author, grp, post)
+    SELECT
+        new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'),
+        'u' || post.author_id, coalesce('g' || post.group_id, ''), post.id
+    FROM posts_post post
+        WHERE post.id = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_delete
+    AFTER DELETE ON posts_comment
+    BEGIN
+        DELETE FROM posts_comment_search WHERE rowid = old.id;
+    END
+    """,
+    'DELETE FROM posts_post_search',
+    'DELETE FROM posts_comment_search',
+    """
+    INSERT INTO posts_post_search(rowid, text, author, grp)
+    SELECT
+        post.id, replace(replace(post.text, 'ё', 'е'), 'Ё', 'Е'),
+        'u' || post.author_id, coalesce('g' || post.group_id, '')
+    FROM posts_post post
+    """,
+    """
+    INSERT INTO posts_comment_search(rowid, text, author, grp, post)
+    SELECT
+        comment.id, replace(replace(comment.text, 'ё', 'е'), 'Ё', 'Е'),
+        'u' || post.author_id, coalesce('g' || post.group_id, ''), post.id
+    FROM posts_post post
+    JOIN posts_comment comment ON comment.post_id = post.id
+    """,
+    "INSERT INTO posts_post_search(posts_post_search) VALUES ('optimize')",
+    """
+    INSERT INTO posts_comment_search(posts_comment_search)
+    VALUES ('optimize')
+    """,
+]
+
+DROP_INDEX = [
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_labels',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_comment_search',
+    'DROP TABLE IF EXISTS posts_post_search',
+]
+
+
+def execute(schema_editor, statements):
+    # На других СУБД поиск работает без индекса (posts/search.py).
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def split_comments(apps, schema_editor):
+    execute(schema_editor, DROP_OLD_INDEX + CREATE_INDEX)
+
+
+def join_comments(apps, schema_editor):
+    previous = import_module('posts.migrations.0014_post_search')
+    execute(schema_editor, DROP_INDEX + previous.CREATE_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_comments, join_comments),
+    ]
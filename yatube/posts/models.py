@@ -4,6 +4,34 @@ from django.urls import reverse
 
 User = get_user_model()
 
+# Колонки, которые карточки постов в лентах не показывают.
+FEED_DEFERRED_FIELDS = (
+    'author__password',
+    'author__last_login',
+    'author__is_superuser',
+    'author__email',
+    'author__is_staff',
+    'author__is_active',
+    'author__date_joined',
+    'group__description',
+)
+
+
+def with_feed_relations(queryset, prefix=''):
+    """Загружает автора и группу поста тем же запросом, что и сам пост.
+
+    prefix - путь до поста, например 'post__' для TimelineEntry.
+    """
+    return queryset.select_related(
+        f'{prefix}author', f'{prefix}group'
+    ).defer(*(prefix + field for field in FEED_DEFERRED_FIELDS))
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент, см. with_feed_relations."""
+        return with_feed_relations(self)
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -13,6 +41,11 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    # Версия карточки поста в кеше (posts/cards.py).
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,9 +65,41 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Заполняются формой при загрузке (posts/uploads.py). width_field и
+    # height_field не используются: с ними Django открывает файл при
+    # создании каждого экземпляра, у которого размеры не заполнены.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['pub_date']
+        # Порядок задаётся явно в каждой ленте (см. FEED_ORDERING):
+        # Meta.ordering добавлял бы ORDER BY в агрегаты и подзапросы.
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -96,6 +161,12 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -130,3 +201,121 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user.username}, {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок.
+
+    Строки раскладываются по подписчикам при публикации поста, поэтому
+    лента читается одним диапазоном по индексу (user, pub_date, post).
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'{self.user_id}, {self.post_id}'
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Поддерживаются сигналами (см. posts/stats.py), расхождения
+    исправляет команда reconcile_stats.
+    """
+    author = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class ImportCheckpoint(models.Model):
+    """Докуда дошёл импорт постов из источника (import_posts).
+
+    Сохраняется в той же транзакции, что и пачка постов, поэтому
+    прерванный импорт продолжается без пропусков и повторов.
+    """
+    source = models.CharField(
+        'Источник',
+        max_length=255,
+        unique=True,
+    )
+    position = models.BigIntegerField(
+        'Обработано строк',
+        default=0,
+    )
+    updated = models.DateTimeField(
+        'Обновлено',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return f'{self.source}: {self.position}'
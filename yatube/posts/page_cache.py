@@ -0,0 +1,181 @@
+"""Кеш страниц целиком с дырками под пользователя.
+
+Страница ленты одинакова для всех, кроме шапки, переключателя лент и
+кнопки подписки. Эти места в шаблонах выводятся тегом {% page_hole %}:
+на кешируемой странице вместо фрагмента остаётся метка с именем
+шаблона и его параметрами. Тело страницы с метками хранится одно на
+путь, параметры PAGE_PARAMS и поколение ленты (feed_cache), а метки
+при ответе заменяются фрагментами, которые кешируются отдельно на
+пользователя. Страницы с другими параметрами не кешируются.
+
+Ленты (feed_page_cache) кешируются так же, но под ключом ленты
+(feed_cache.feed_key) и через get_or_fill: вся работа view с базой идёт
+внутри пересчёта, поэтому при ошибке базы отдаётся последнее тело.
+"""
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from core.cache import get_or_fill
+
+from .feed_cache import feed_generation, feed_key, follow_generation
+
+PAGE_KEY = 'posts:page:{}:{}'
+FEED_KEY = 'posts:page:feed-page:{}'
+HOLE_KEY = 'posts:page:hole:{}'
+HOLE = '<!--page-hole:{}-->'
+HOLE_RE = re.compile(r'<!--page-hole:([^>]*)-->')
+# Параметры запроса, от которых зависит страница. С любыми другими
+# страница не кешируется: произвольные query string не забивают кеш.
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def _digest(*parts):
+    return hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def is_active(request):
+    """Рендерится ли страница для кеша, то есть с метками."""
+    return getattr(request, 'page_cache', False)
+
+
+def hole(template_name, params):
+    """Метка фрагмента template_name с параметрами params (строки)."""
+    return HOLE.format(urlencode({'template': template_name, **params}))
+
+
+def render_hole(request, marker):
+    params = dict(parse_qsl(marker))
+    template_name = params.pop('template')
+    user = request.user
+    parts = [
+        template_name,
+        sorted(params.items()),
+        request.resolver_match.view_name if request.resolver_match else '',
+        user.pk,
+        user.get_username(),
+    ]
+    if user.is_authenticated:
+        # Кнопка подписки зависит от подписок пользователя.
+        parts.append(follow_generation(user.pk))
+    key = HOLE_KEY.format(_digest(*parts))
+    content = cache.get(key)
+    if content is None:
+        content = render_to_string(template_name, params, request)
+        cache.set(key, content, settings.PAGE_CACHE_TIMEOUT)
+    return content
+
+
+def fill_holes(request, content):
+    return HOLE_RE.sub(
+        lambda match: render_hole(request, match.group(1)), content
+    )
+
+
+def page_key(request):
+    """Ключ страницы или None, если её не кешировать."""
+    if any(name not in PAGE_PARAMS or len(request.GET.getlist(name)) > 1
+           for name in request.GET):
+        return None
+    params = urlencode(
+        [(name, request.GET[name]) for name in PAGE_PARAMS
+         if name in request.GET]
+    )
+    # page_version - состояние, от которого посчитан ETag страницы
+    # (posts/etags.py): с ним тело не расходится с ETag.
+    return PAGE_KEY.format(
+        feed_generation(),
+        _digest(request.path, params, getattr(request, 'page_version', '')),
+    )
+
+
+class Uncacheable(Exception):
+    """Ответ view, который не кладётся в кеш: не 200 или потоковый."""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
+def render_page(view, request, *args, **kwargs):
+    """Тело и Content-Type ответа 200 view, иначе Uncacheable."""
+    response = view(request, *args, **kwargs)
+    if response.streaming:
+        raise Uncacheable(response)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise Uncacheable(response)
+    return response.content.decode(response.charset), response['Content-Type']
+
+
+def feed_page_cache(feed):
+    """Кеширует GET-ответы 200 ленты feed через get_or_fill.
+
+    При ошибке базы, пока тело в кеше (с FEED_CACHE_GRACE), отдаётся
+    последнее отрендеренное. Другие ответы view отдаются как есть.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            request.page_cache = True
+            try:
+                content, content_type = get_or_fill(
+                    FEED_KEY.format(_digest(feed_key(request, feed))),
+                    lambda: render_page(view, request, *args, **kwargs),
+                    settings.FEED_CACHE_TIMEOUT,
+                    grace=settings.FEED_CACHE_GRACE,
+                )
+            except Uncacheable as uncacheable:
+                response = uncacheable.response
+                if not response.streaming:
+                    response.content = fill_holes(
+                        request, response.content.decode(response.charset)
+                    )
+                return response
+            return HttpResponse(
+                fill_holes(request, content), content_type=content_type
+            )
+        return wrapped
+    return decorator
+
+
+def page_cache(view):
+    """Кеширует GET-ответы 200 view целиком, кроме {% page_hole %}."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = None
+        if request.method in ('GET', 'HEAD'):
+            key = page_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        page = cache.get(key)
+        if page is not None:
+            content, content_type = page
+            response = HttpResponse(content_type=content_type)
+        else:
+            request.page_cache = True
+            response = view(request, *args, **kwargs)
+            if response.streaming:
+                return response
+            if hasattr(response, 'render'):
+                response.render()
+            content = response.content.decode(response.charset)
+            if response.status_code == 200:
+                cache.set(
+                    key, (content, response['Content-Type']),
+                    settings.PAGE_CACHE_TIMEOUT,
+                )
+        response.content = fill_holes(request, content)
+        return response
+    return wrapped
@@ -0,0 +1,265 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-id')
+# Таблицы меньше этого считаются точно: COUNT(*) по ним дешёвый.
+EXACT_COUNT_LIMIT = 10000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """Распаковывает токен обратно в значения полей модели."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError(token)
+        return [
+            field.to_python(value) for field, value in zip(fields, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        raise InvalidCursor(token)
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс Page там, где его используют шаблоны,
+    но вместо номеров страниц отдаёт токены соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по составному ключу, по умолчанию (pub_date, id).
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница - это диапазонный
+    запрос от последней записи предыдущей страницы, поэтому глубина
+    страницы не влияет на время ответа.
+    """
+
+    def __init__(self, queryset, per_page, ordering=FEED_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.model_fields = [
+            queryset.model._meta.get_field(field) for field in self.fields
+        ]
+
+    def _key(self, obj):
+        # Строки бывают и словарями - при пагинации QuerySet.values().
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _seek(self, values, forward):
+        """Условие "строго после ключа" в порядке сортировки."""
+        condition = Q()
+        for position, ordering in enumerate(reversed(self.ordering)):
+            index = len(self.ordering) - 1 - position
+            field = self.fields[index]
+            descending = ordering.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            if position:
+                step |= Q(**{field: values[index]}) & condition
+            condition = step
+        # Избыточная нестрогая граница по первому полю позволяет SQLite
+        # начать просмотр индекса прямо с курсора, а не с начала ленты.
+        descending = self.ordering[0].startswith('-')
+        lookup = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{self.fields[0]}__{lookup}': values[0]}) & condition
+
+    def page(self, after=None, before=None):
+        queryset = self.queryset
+        if before is not None:
+            values = decode_cursor(before, self.model_fields)
+            reverse = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ]
+            rows = list(
+                queryset.filter(self._seek(values, forward=False))
+                .order_by(*reverse)[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            next_cursor = (
+                encode_cursor(self._key(rows[-1])) if rows else None
+            )
+            previous_cursor = (
+                encode_cursor(self._key(rows[0])) if has_more and rows
+                else None
+            )
+        else:
+            if after is not None:
+                values = decode_cursor(after, self.model_fields)
+                queryset = queryset.filter(self._seek(values, forward=True))
+            rows = list(
+                queryset.order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            next_cursor = (
+                encode_cursor(self._key(rows[-1])) if has_more else None
+            )
+            previous_cursor = (
+                encode_cursor(self._key(rows[0])) if after and rows
+                else None
+            )
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def cursor_page(request, queryset, per_page, ordering=FEED_ORDERING):
+    """Страница курсорной пагинации по ?after= / ?before=.
+
+    Испорченный курсор даёт первую страницу.
+    """
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    try:
+        return paginator.page(
+            after=request.GET.get('after') or None,
+            before=request.GET.get('before') or None,
+        )
+    except InvalidCursor:
+        return paginator.page()
+
+
+def paginate(request, queryset, per_page, ordering=FEED_ORDERING):
+    """Возвращает страницу ленты.
+
+    Если в запросе есть ?after= или ?before=, используется курсорная
+    пагинация, иначе - обычная постраничная по ?page=. Ссылка "дальше"
+    с нумерованной страницы тоже курсорная (page.next_cursor), так что
+    листание ленты уходит с OFFSET уже со второй страницы.
+    """
+    if request.GET.get('after') or request.GET.get('before'):
+        return cursor_page(request, queryset, per_page, ordering)
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    page = paginator.get_page(request.GET.get('page'))
+    page.next_cursor = None
+    if page.has_next():
+        last = page[len(page) - 1]
+        page.next_cursor = encode_cursor(
+            CursorPaginator(queryset, per_page, ordering)._key(last)
+        )
+    return page
+
+
+def _analyzed_count(cursor, table):
+    """Число строк table по статистике ANALYZE или None, если её нет."""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+        "AND name = 'sqlite_stat1'"
+    )
+    if cursor.fetchone() is None:
+        return None
+    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    # Первое число stat - строки таблицы (для индекса - его записи).
+    return int(row[0].split()[0])
+
+
+def estimate_count(queryset):
+    """Приблизительное число строк таблицы без COUNT(*).
+
+    На SQLite это число строк из статистики ANALYZE (sqlite_stat1), а
+    без неё - разброс первичных ключей (два поиска по индексу):
+    удалённые строки завышают оценку. На других СУБД - None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlite':
+        return None
+    model = queryset.model
+    with connection.cursor() as cursor:
+        analyzed = _analyzed_count(cursor, model._meta.db_table)
+        if analyzed is not None:
+            return analyzed
+        cursor.execute(
+            'SELECT max({pk}) - min({pk}) + 1 FROM {table}'.format(
+                pk=connection.ops.quote_name(model._meta.pk.column),
+                table=connection.ops.quote_name(model._meta.db_table),
+            )
+        )
+        return cursor.fetchone()[0] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших таблиц в админке.
+
+    Без фильтров и поиска число строк оценивается (estimate_count),
+    а не считается COUNT(*) по всей таблице; маленькие таблицы и
+    отфильтрованные выборки по-прежнему считаются точно. Если оценка
+    завышена и страница вышла пустой, число строк пересчитывается
+    точно, а номер страницы прижимается к последней.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                self.estimated = True
+                return estimate
+        return queryset.count()
+
+    estimated = False
+
+    def page(self, number):
+        page = super().page(number)
+        if self.estimated and not page.object_list and page.number > 1:
+            self.estimated = False
+            self.count = self.object_list.count()
+            self.__dict__.pop('num_pages', None)
+            page = super().page(min(page.number, self.num_pages))
+        return page
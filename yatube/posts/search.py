@@ -0,0 +1,425 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite поиск идёт по двум виртуальным таблицам FTS5: в
+posts_post_search строка на пост, в posts_comment_search - на
+комментарий, с меткой его поста. Новый или удалённый комментарий
+меняет только свою строку, а не пересобирает текст всех комментариев
+поста. Таблицы синхронизируют триггеры на posts_post и posts_comment,
+в том числе при bulk_create и правках в обход ORM. Фильтры по автору и
+группе - это тоже условия FTS5, поэтому они пересекаются со списками
+совпадений внутри индекса, без JOIN.
+
+Пост находится, если все слова запроса есть в его тексте или в одном
+из его комментариев.
+
+Django пересоздаёт таблицу SQLite при многих миграциях, а вместе с
+таблицей пропадают и её триггеры, поэтому они ставятся заново после
+каждого migrate (install_triggers).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import FEED_ORDERING
+
+TABLE = 'posts_post_search'
+COMMENT_TABLE = 'posts_comment_search'
+MAX_TERMS = 10
+MAX_RESULTS = 1000
+# Слова чаще этого не ранжируются по bm25 (см. SearchResults).
+RANKED_TERM_DOCS = 10000
+SNIPPET_TOKENS = 24
+# Границы подсветки в snippet(); в тексте постов их не бывает.
+MARK_START, MARK_END = '\x02', '\x03'
+
+TERM_RE = re.compile(r'\w+')
+
+
+def fold(expression):
+    """SQL, заменяющий ё на е: unicode61 не считает их одной буквой."""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+# author и grp хранят метки u<id> и g<id> для фильтров; у комментария -
+# метки его поста.
+CREATE_TABLE = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        text, author, grp,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_TABLE} USING fts5(
+        text, author, grp, post UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Совпадение в тексте поста весит больше, чем в комментарии.
+    f"""
+    INSERT INTO {TABLE}({TABLE}, rank)
+    VALUES ('rank', 'bm25(10.0, 0.0, 0.0)')
+    """,
+    f"""
+    INSERT INTO {COMMENT_TABLE}({COMMENT_TABLE}, rank)
+    VALUES ('rank', 'bm25(2.0, 0.0, 0.0, 0.0)')
+    """,
+]
+
+INSERT_COMMENT_SQL = f"""
+    INSERT INTO {COMMENT_TABLE}(rowid, text, author, grp, post)
+    SELECT
+        {{comment}}.id, {fold('{comment}.text')},
+        'u' || post.author_id, coalesce('g' || post.group_id, ''), post.id
+    FROM posts_post post
+"""
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_insert
+    AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}(rowid, text, author, grp)
+        VALUES (
+            new.id, {fold('new.text')},
+            'u' || new.author_id, coalesce('g' || new.group_id, '')
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_update
+    AFTER UPDATE OF text, author_id, group_id ON posts_post
+    BEGIN
+        UPDATE {TABLE} SET
+            text = {fold('new.text')},
+            author = 'u' || new.author_id,
+            grp = coalesce('g' || new.group_id, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    # Метки комментариев меняются, только если пост сменил автора или
+    # группу: save() переписывает все колонки, отсюда WHEN.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_labels
+    AFTER UPDATE OF author_id, group_id ON posts_post
+    WHEN old.author_id IS NOT new.author_id
+        OR old.group_id IS NOT new.group_id
+    BEGIN
+        UPDATE {COMMENT_TABLE} SET
+            author = 'u' || new.author_id,
+            grp = coalesce('g' || new.group_id, '')
+        WHERE rowid IN (
+            SELECT id FROM posts_comment WHERE post_id = new.id
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_search_delete
+    AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_insert
+    AFTER INSERT ON posts_comment
+    BEGIN
+        {INSERT_COMMENT_SQL.format(comment='new')}
+        WHERE post.id = new.post_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_update
+    AFTER UPDATE OF text, post_id ON posts_comment
+    BEGIN
+        DELETE FROM {COMMENT_TABLE} WHERE rowid = old.id;
+        {INSERT_COMMENT_SQL.format(comment='new')}
+        WHERE post.id = new.post_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_comment_search_delete
+    AFTER DELETE ON posts_comment
+    BEGIN
+        DELETE FROM {COMMENT_TABLE} WHERE rowid = old.id;
+    END
+    """,
+]
+
+REBUILD = [
+    f'DELETE FROM {TABLE}',
+    f'DELETE FROM {COMMENT_TABLE}',
+    f"""
+    INSERT INTO {TABLE}(rowid, text, author, grp)
+    SELECT
+        post.id, {fold('post.text')},
+        'u' || post.author_id, coalesce('g' || post.group_id, '')
+    FROM posts_post post
+    """,
+    f"""
+    {INSERT_COMMENT_SQL.format(comment='comment')}
+    JOIN posts_comment comment ON comment.post_id = post.id
+    """,
+    f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')",
+    f"INSERT INTO {COMMENT_TABLE}({COMMENT_TABLE}) VALUES ('optimize')",
+]
+
+DROP = [
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_labels',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    f'DROP TABLE IF EXISTS {COMMENT_TABLE}',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def _execute(using, statements):
+    with using.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_index(using=connection):
+    _execute(using, CREATE_TABLE + TRIGGERS + REBUILD)
+
+
+def drop_index(using=connection):
+    _execute(using, DROP)
+
+
+def rebuild_index(using=connection):
+    _execute(using, REBUILD)
+
+
+def install_triggers(using=connection):
+    """Ставит триггеры, если таблицы индекса уже созданы."""
+    tables = using.introspection.table_names()
+    if TABLE in tables and COMMENT_TABLE in tables:
+        _execute(using, TRIGGERS)
+
+
+def search_terms(text):
+    """Слова запроса в кавычках: синтаксис FTS5 из запроса не выполняется."""
+    text = text.replace('ё', 'е').replace('Ё', 'Е')
+    return ['"%s"' % term for term in TERM_RE.findall(text)[:MAX_TERMS]]
+
+
+def text_expression(terms):
+    """Условие FTS5: все слова в тексте поста или комментария."""
+    return 'text: (%s)' % ' '.join(terms)
+
+
+def filter_posts(queryset, terms):
+    """Посты queryset, в тексте или комментарии которых есть все слова."""
+    expression = text_expression(terms)
+    return queryset.filter(
+        Q(pk__in=RawSQL(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+            [expression],
+        ))
+        | Q(pk__in=RawSQL(
+            f'SELECT post FROM {COMMENT_TABLE} '
+            f'WHERE {COMMENT_TABLE} MATCH %s',
+            [expression],
+        ))
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def _count(table, expression, limit):
+    """Число совпадений в table, но не больше limit: дальше индекс не
+    читается."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {table} '
+            f'WHERE {table} MATCH %s LIMIT %s)',
+            [expression, limit],
+        )
+        return cursor.fetchone()[0]
+
+
+def _snippets(table, post_column, expression, post_ids):
+    """{пост: фрагмент с подсветкой} по совпадениям в table."""
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    rows = f'rowid IN ({placeholders})'
+    if table == COMMENT_TABLE:
+        rows = (
+            f'rowid IN (SELECT id FROM posts_comment '
+            f'WHERE post_id IN ({placeholders}))'
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {post_column}, snippet({table}, 0, %s, %s, '…', "
+            f'{SNIPPET_TOKENS}) FROM {table} '
+            f'WHERE {table} MATCH %s AND {rows}',
+            [MARK_START, MARK_END, expression, *post_ids],
+        )
+        return dict(reversed(cursor.fetchall()))
+
+
+class SearchResults:
+    """Найденные посты для Paginator.
+
+    Найденное ограничено MAX_RESULTS постами. bm25 перед ранжированием
+    читает весь список документов каждого слова, поэтому по
+    релевантности сортируются только запросы из слов, встречающихся
+    не чаще чем в RANKED_TERM_DOCS постах и комментариях, а широкие
+    запросы - по новизне: из каждой таблицы индекса берутся последние
+    MAX_RESULTS совпадений, что FTS5 отдаёт, не читая их целиком.
+
+    Срез выбирает из индекса только id постов своей страницы, затем
+    догружает посты и фрагменты с подсвеченными словами: из текста
+    поста, а если слова нашлись только в комментарии - из него.
+    """
+
+    def __init__(self, terms, author=None, group=None):
+        self.terms = terms
+        self.author = author
+        self.group = group
+        self._count = None
+
+    @cached_property
+    def ranked(self):
+        return all(
+            _count(TABLE, text_expression([term]), RANKED_TERM_DOCS + 1)
+            + _count(COMMENT_TABLE, text_expression([term]),
+                     RANKED_TERM_DOCS + 1)
+            <= RANKED_TERM_DOCS
+            for term in self.terms
+        )
+
+    def _matches(self):
+        """Подзапрос совпадений (post, rank) по обеим таблицам.
+
+        При ранжировании фильтры проверяются по posts_post: метки
+        автора и группы в запросе FTS5 тоже попали бы в bm25.
+        """
+        expression = text_expression(self.terms)
+        conditions, params = [], []
+        if self.ranked:
+            for field, value in (('author_id', self.author),
+                                 ('group_id', self.group)):
+                if value is not None:
+                    conditions.append(f'post.{field} = %s')
+                    params.append(value.pk)
+        else:
+            if self.author is not None:
+                expression += ' AND author: u%d' % self.author.pk
+            if self.group is not None:
+                expression += ' AND grp: g%d' % self.group.pk
+        condition = ''.join(f' AND {item}' for item in conditions)
+        parts, part_params = [], []
+        for table, post_column in ((TABLE, f'{TABLE}.rowid'),
+                                   (COMMENT_TABLE, f'{COMMENT_TABLE}.post')):
+            if self.ranked:
+                # CROSS JOIN не даёт SQLite начать с индекса группы.
+                parts.append(
+                    f'SELECT {post_column} AS post, {table}.rank AS rank '
+                    f'FROM {table} CROSS JOIN posts_post post '
+                    f'ON post.id = {post_column} '
+                    f'WHERE {table} MATCH %s{condition}'
+                )
+                part_params += [expression, *params]
+            else:
+                parts.append(
+                    f'SELECT * FROM (SELECT {post_column} AS post, 0 AS rank '
+                    f'FROM {table} WHERE {table} MATCH %s '
+                    f'ORDER BY {table}.rowid DESC LIMIT %s)'
+                )
+                part_params += [expression, MAX_RESULTS]
+        return ' UNION ALL '.join(parts), part_params
+
+    def count(self):
+        if self._count is None:
+            matches, params = self._matches()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM (SELECT post FROM ({matches}) '
+                    f'GROUP BY post LIMIT %s)',
+                    [*params, MAX_RESULTS],
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    @property
+    def truncated(self):
+        return self.count() >= MAX_RESULTS
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = min(index.stop, MAX_RESULTS)
+        if start >= stop:
+            return []
+        matches, params = self._matches()
+        order = 'min(rank), post DESC' if self.ranked else 'post DESC'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post FROM ({matches}) GROUP BY post '
+                f'ORDER BY {order} LIMIT %s OFFSET %s',
+                [*params, stop - start, start],
+            )
+            post_ids = [row[0] for row in cursor.fetchall()]
+        if not post_ids:
+            return []
+        expression = text_expression(self.terms)
+        snippets = _snippets(TABLE, 'rowid', expression, post_ids)
+        missing = [pk for pk in post_ids if pk not in snippets]
+        if missing:
+            snippets.update(
+                _snippets(COMMENT_TABLE, 'post', expression, missing)
+            )
+        posts = Post.objects.feed().in_bulk(post_ids)
+        results = []
+        for pk in post_ids:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.snippet = highlight(snippets.get(pk, post.text))
+            results.append(post)
+        return results
+
+
+def search_posts(text, author=None, group=None):
+    """Посты, подходящие под запрос, для Paginator.
+
+    На других СУБД, где нет FTS5, ищет простым вхождением строки.
+    """
+    if not is_supported():
+        posts = Post.objects.feed().filter(
+            Q(text__icontains=text) | Q(comments__text__icontains=text)
+        )
+        if author is not None:
+            posts = posts.filter(author=author)
+        if group is not None:
+            posts = posts.filter(group=group)
+        return posts.distinct().order_by(*FEED_ORDERING)
+    terms = search_terms(text)
+    if not terms:
+        return Post.objects.none()
+    return SearchResults(terms, author, group)
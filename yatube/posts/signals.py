@@ -0,0 +1,108 @@
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed_cache, feeds, search, stats, timeline
+from .models import Comment, Follow, Group, Post
+
+
+def invalidate_feeds(post, *groups):
+    feeds.invalidate(
+        authors=[post.author.username],
+        groups=[post.group.slug if post.group else None, *groups],
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # При правке пост мог уйти из группы: её RSS и ETag тоже надо
+    # сбросить.
+    instance._previous_group = None
+    instance._previous_group_id = None
+    if not raw and not instance._state.adding:
+        instance._previous_group, instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group__slug', 'group_id').first()
+            or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    feed_cache.bump_feed_generation()
+    feed_cache.bump_post_generations(
+        [instance.author_id],
+        [instance.group_id, getattr(instance, '_previous_group_id', None)],
+    )
+    if not raw:
+        invalidate_feeds(instance, getattr(instance, '_previous_group', None))
+    if created and not raw:
+        stats.bump(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump_feed_generation()
+    feed_cache.bump_post_generations(
+        [instance.author_id], [instance.group_id]
+    )
+    invalidate_feeds(instance)
+    stats.bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, raw=False, **kwargs):
+    # Со сменой slug лента по старому адресу тоже устаревает.
+    instance._previous_slug = None
+    if not raw and not instance._state.adding:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    # Название и описание группы - в заголовке её RSS и Atom.
+    if not raw:
+        feeds.invalidate(
+            groups=[instance.slug, getattr(instance, '_previous_slug', None)]
+        )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.user_id and instance.author_id:
+        stats.bump(instance.author_id, 'followers_count', 1)
+        stats.bump(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        feed_cache.bump_follow_generation(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'followers_count', -1)
+    stats.bump(instance.user_id, 'following_count', -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    timeline.rejoin_fanout(instance.author_id)
+    feed_cache.bump_follow_generation(instance.user_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_migrate)
+def search_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name == 'posts' and search.is_supported(connection):
+        search.install_triggers(connection)
@@ -0,0 +1,128 @@
+"""Счётчики постов, подписок и комментариев пользователя."""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+# Поле счётчика -> (модель, поле с пользователем)
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def shifted(counter, delta):
+    """Выражение "счётчик + delta", не уходящее ниже нуля.
+
+    Счётчик мог разойтись с данными и уже быть нулём: уменьшение без
+    ограничения нарушило бы CHECK (>= 0) поля PositiveIntegerField.
+    """
+    if delta < 0:
+        return Greatest(F(counter) + delta, 0)
+    return F(counter) + delta
+
+
+def bump(user_id, counter, delta):
+    """Атомарно сдвигает счётчик пользователя на delta."""
+    if user_id is None:
+        return
+    updated = AuthorStats.objects.filter(author_id=user_id).update(
+        **{counter: shifted(counter, delta)}
+    )
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=user_id, **{counter: delta})
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        AuthorStats.objects.filter(author_id=user_id).update(
+            **{counter: shifted(counter, delta)}
+        )
+
+
+def bump_many(counter, deltas, batch_size=500):
+    """bump для многих пользователей сразу: {user_id: delta}.
+
+    Недостающие строки создаются одним запросом, а сдвиг - по запросу
+    на каждое различное значение delta.
+    """
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=user_id) for user_id in deltas],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    users = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users[delta].append(user_id)
+    for delta, user_ids in users.items():
+        for start in range(0, len(user_ids), batch_size):
+            AuthorStats.objects.filter(
+                author_id__in=user_ids[start:start + batch_size]
+            ).update(**{counter: shifted(counter, delta)})
+
+
+def get_stats(user):
+    """Счётчики пользователя без агрегирующих запросов.
+
+    Для пользователя, загруженного с select_related('stats'),
+    не выполняет запросов вовсе.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(author=user)
+
+
+def actual_counts(counter, user_ids):
+    model, field = COUNTERS[counter]
+    return dict(
+        model.objects.filter(**{f'{field}__in': user_ids})
+        .values_list(field)
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+
+
+def reconcile(batch_size=500):
+    """Пересчитывает счётчики пачками пользователей.
+
+    Возвращает число исправленных записей.
+    """
+    fixed = 0
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    while True:
+        batch = list(user_ids.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return fixed
+        last_id = batch[-1]
+        actual = {
+            counter: actual_counts(counter, batch) for counter in COUNTERS
+        }
+        existing = AuthorStats.objects.in_bulk(batch)
+        to_create, to_update = [], []
+        for user_id in batch:
+            values = {
+                counter: counts.get(user_id, 0)
+                for counter, counts in actual.items()
+            }
+            stats = existing.get(user_id)
+            if stats is None:
+                if any(values.values()):
+                    to_create.append(AuthorStats(author_id=user_id, **values))
+                continue
+            if any(getattr(stats, name) != value
+                   for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(stats, name, value)
+                to_update.append(stats)
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(to_create)
+            AuthorStats.objects.bulk_update(to_update, list(COUNTERS))
+        fixed += len(to_create) + len(to_update)
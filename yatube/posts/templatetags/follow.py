@@ -0,0 +1,14 @@
+from django import template
+
+from ..models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, username):
+    """Подписан ли пользователь запроса на автора username."""
+    user = context['request'].user
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
@@ -0,0 +1,50 @@
+from django import template
+
+from .. import page_cache
+
+register = template.Library()
+
+
+class PageHoleNode(template.Node):
+    def __init__(self, template_name, params):
+        self.template_name = template_name
+        self.params = params
+
+    def render(self, context):
+        template_name = self.template_name.resolve(context)
+        params = {
+            name: value.resolve(context) for name, value in self.params.items()
+        }
+        request = context.get('request')
+        if request is not None and page_cache.is_active(request):
+            # Ложные значения не передаются: в шаблоне они и так ложны.
+            return page_cache.hole(template_name, {
+                name: str(value) for name, value in params.items() if value
+            })
+        fragment = context.template.engine.get_template(template_name)
+        with context.push(**params):
+            return fragment.render(context)
+
+
+@register.tag
+def page_hole(parser, token):
+    """Фрагмент под пользователя на странице из кеша (posts/page_cache.py).
+
+        {% page_hole 'includes/header.html' [name=value ...] %}
+
+    Без кеша страниц работает как {% include %}. В кешируемой странице
+    оставляет метку, и фрагмент рендерится при ответе только с
+    переданными параметрами (их значения приводятся к строкам), запросом
+    и контекст-процессорами.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает имя шаблона'
+        )
+    params = template.base.token_kwargs(bits[2:], parser)
+    if len(params) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: параметры передаются как name=value'
+        )
+    return PageHoleNode(parser.compile_filter(bits[1]), params)
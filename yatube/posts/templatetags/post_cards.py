@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, size):
+    """Карточки постов ленты из кеша (posts/cards.py):
+
+        {% post_cards page_obj 'card' as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+    """
+    return [mark_safe(card) for card in cards.render_cards(posts, size)]
@@ -0,0 +1,33 @@
+from django import template
+from django.conf import settings
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, size):
+    """Миниатюры всей страницы одним запросом.
+
+    Результат кладётся в page_thumbnails, и ready_thumbnail берёт
+    миниатюры оттуда:
+        {% prefetch_thumbnails page_obj 'card' as page_thumbnails %}
+    """
+    resolved = thumbnails.resolve((post.image for post in posts), size)
+    return {(name, size): image for name, image in resolved.items()}
+
+
+@register.simple_tag(takes_context=True)
+def ready_thumbnail(context, image, size):
+    """Готовая миниатюра картинки или None, пока её готовит пул."""
+    page_thumbnails = context.get('page_thumbnails') or {}
+    if image and (str(image), size) in page_thumbnails:
+        return page_thumbnails[(str(image), size)]
+    return thumbnails.ready_thumbnail(image, size)
+
+
+@register.filter
+def placeholder_style(size):
+    width, height = settings.POST_THUMBNAILS[size][0].split('x')
+    return f'width: {width}px; height: {height}px;'
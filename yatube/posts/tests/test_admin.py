@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..paginators import EstimatedCountPaginator
+
+
+class AdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, number):
+        start = Post.objects.count()
+        for index in range(start, start + number):
+            author = User.objects.create_user(username=f'user{index}')
+            post = Post.objects.create(
+                author=author, group=self.group, text=f'Пост {index}'
+            )
+            Comment.objects.create(post=post, author=author, text='Ага')
+            Follow.objects.create(user=author, author=self.admin)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(context)
+
+    def test_changelists_without_n_plus_one(self):
+        """Число запросов страницы списка не растёт с числом строк."""
+        self.add_rows(1)
+        # Первый запрос кладёт пользователя в кеш (core/auth.py).
+        self.changelist_queries('post')
+        before = {
+            model: self.changelist_queries(model)
+            for model in ('post', 'comment', 'follow')
+        }
+        self.add_rows(5)
+        for model, queries in before.items():
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), queries)
+
+    def test_foreign_keys_use_autocomplete(self):
+        """В формах не выводится список всех пользователей и групп."""
+        self.add_rows(3)
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=[post.pk])
+        )
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'user2</option>')
+
+    def test_estimated_count(self):
+        self.add_rows(3)
+        Post.objects.filter(text='Пост 1').delete()
+        queryset = Post.objects.order_by('-pk')
+        with mock.patch('posts.paginators.EXACT_COUNT_LIMIT', 0):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 3)
+            self.assertEqual(
+                EstimatedCountPaginator(queryset.filter(text='Пост 0'), 10)
+                .count,
+                1,
+            )
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 2)
+
+    def test_estimated_count_from_analyze(self):
+        self.add_rows(3)
+        Post.objects.filter(text='Пост 1').delete()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE posts_post')
+        with mock.patch('posts.paginators.EXACT_COUNT_LIMIT', 0):
+            self.assertEqual(
+                EstimatedCountPaginator(Post.objects.all(), 10).count, 2
+            )
+
+    def test_overestimated_last_page_clamped(self):
+        """Пустая из-за завышенной оценки страница - последняя."""
+        self.add_rows(6)
+        Post.objects.exclude(text__in=['Пост 0', 'Пост 5']).delete()
+        with mock.patch('posts.paginators.EXACT_COUNT_LIMIT', 0):
+            paginator = EstimatedCountPaginator(
+                Post.objects.order_by('-pk'), 1
+            )
+            self.assertEqual(paginator.num_pages, 6)
+            page = paginator.page(5)
+        self.assertEqual(page.number, 2)
+        self.assertEqual([post.text for post in page], ['Пост 0'])
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_search_uses_full_text_index(self):
+        self.add_rows(3)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пост 2'}
+        )
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Пост 2'],
+        )
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from .utils import FeedQueriesMixin
+
+
+class ApiTest(FeedQueriesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {index}'
+            )
+            for index in range(13)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def walk(self, url):
+        texts = []
+        while url:
+            data = self.client.get(url).json()
+            texts += [post['text'] for post in data['results']]
+            url = data['next']
+        return texts
+
+    def test_feeds_walk_by_cursor(self):
+        expected = [f'Пост {index}' for index in range(12, -1, -1)]
+        for url in (
+            reverse('post:api_index'),
+            reverse('post:api_group', args=['group']),
+            reverse('post:api_profile', args=['author']),
+            reverse('post:api_follow'),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), expected)
+
+    def test_previous_page(self):
+        first = self.client.get(reverse('post:api_index')).json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fields(self):
+        data = self.client.get(
+            reverse('post:api_post', args=[self.posts[0].pk]),
+            {'fields': 'id,author,group'},
+        ).json()
+        self.assertEqual(data, {
+            'id': self.posts[0].pk, 'author': 'author', 'group': 'group',
+        })
+        response = self.client.get(
+            reverse('post:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_ids_in_one_query(self):
+        ids = [self.posts[3].pk, self.posts[1].pk, 10 ** 6]
+        url = reverse('post:api_index')
+        with self.assertNumQueries(1):
+            data = self.client.get(
+                url, {'ids': ','.join(map(str, ids)), 'fields': 'id'}
+            ).json()
+        self.assertEqual(data['results'], [{'id': ids[0]}, {'id': ids[1]}])
+        self.assertEqual(
+            self.client.get(url, {'ids': '1,x'}).status_code, 400
+        )
+
+    def test_errors_are_json(self):
+        self.assertEqual(
+            self.client.get(reverse('post:api_post', args=[10 ** 6]))
+            .json()['error'],
+            'Не найдено',
+        )
+        self.assertEqual(
+            self.client.get(reverse('post:api_index'), {'after': 'x'})
+            .status_code,
+            400,
+        )
+        response = Client().get(reverse('post:api_follow'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        Post.objects.all().delete()
+        for url in (
+            reverse('post:api_index'),
+            reverse('post:api_follow'),
+        ):
+            with self.subTest(url=url):
+                self.assertFeedQueriesConstant(
+                    self.client, url,
+                    lambda: Post.objects.create(
+                        author=self.author, text='Пост'
+                    ),
+                )
@@ -0,0 +1,107 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, User
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        for number in range(11):
+            Post.objects.create(author=cls.author, text=f'Пост номер {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.stranger_client = Client()
+        self.stranger_client.force_login(self.stranger)
+
+    def test_pages_are_cached_separately(self):
+        """Вторая страница не получает HTML первой."""
+        first = self.client.get(reverse('post:main')).content.decode()
+        second = self.client.get(
+            reverse('post:main') + '?page=2'
+        ).content.decode()
+        self.assertIn('Пост номер 10', first)
+        self.assertNotIn('Пост номер 10', second)
+        self.assertIn('Пост номер 0', second)
+
+    def test_follow_feed_is_cached_per_user(self):
+        """Лента подписок одного пользователя не видна другому."""
+        url = reverse('post:follow_index')
+        self.assertIn(
+            'Пост номер 10', self.reader_client.get(url).content.decode()
+        )
+        self.assertNotIn(
+            'Пост номер 10', self.stranger_client.get(url).content.decode()
+        )
+
+    def test_new_post_invalidates_cached_feeds(self):
+        """Новый пост сразу виден в закешированных лентах."""
+        self.client.get(reverse('post:main'))
+        self.reader_client.get(reverse('post:follow_index'))
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertIn(
+            'Свежий пост',
+            self.client.get(reverse('post:main')).content.decode()
+        )
+        self.assertIn(
+            'Свежий пост',
+            self.reader_client.get(
+                reverse('post:follow_index')
+            ).content.decode()
+        )
+
+    def test_follow_invalidates_follow_feed(self):
+        url = reverse('post:follow_index')
+        self.stranger_client.get(url)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        self.assertIn(
+            'Пост номер 10', self.stranger_client.get(url).content.decode()
+        )
+
+    def test_fragment_is_served_from_cache(self):
+        """Без изменений постов фрагмент берётся из кеша."""
+        self.client.get(reverse('post:main'))
+        Post.objects.filter(text='Пост номер 10').update(text='Изменён')
+        self.assertIn(
+            'Пост номер 10',
+            self.client.get(reverse('post:main')).content.decode()
+        )
+
+    def test_database_error_serves_stale_feed(self):
+        """Если база не отвечает, лента отдаётся из последнего рендера."""
+        feeds = [
+            (self.client, reverse('post:main'), 'posts.views.paginate'),
+            (self.reader_client, reverse('post:follow_index'),
+             'posts.views.timeline.feed_page'),
+        ]
+        # Срок тела ленты вышел, но FEED_CACHE_GRACE ещё нет; часы
+        # сдвигаются и для LRU процесса (core/lru.py).
+        later = settings.FEED_CACHE_TIMEOUT + 1
+        for client, url, query in feeds:
+            with self.subTest(url=url):
+                client.get(url)
+                with mock.patch(query, side_effect=OperationalError), \
+                        mock.patch('time.time',
+                                   return_value=time.time() + later), \
+                        mock.patch('time.monotonic',
+                                   return_value=time.monotonic() + later), \
+                        self.assertLogs('core.cache', 'WARNING'):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                content = response.content.decode()
+                self.assertIn('Пост номер 10', content)
+                self.assertNotIn('<!--page-hole', content)
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import feed_cache
+from ..models import Group, Post, User
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def rendered_cards(self, url):
+        # Новое поколение ленты: страница и фрагменты рендерятся заново,
+        # а карточки берутся из своего кеша.
+        feed_cache.bump_feed_generation()
+        response = self.client.get(url)
+        return response, [
+            template for template in response.templates
+            if template.name == 'includes/post_card.html'
+        ]
+
+    def test_cards_are_shared_between_feeds(self):
+        _, rendered = self.rendered_cards(reverse('post:main'))
+        self.assertEqual(len(rendered), 3)
+        for url in (reverse('post:main'),
+                    reverse('post:group', args=['group']),
+                    reverse('post:profile', args=['author'])):
+            with self.subTest(url=url):
+                response, rendered = self.rendered_cards(url)
+                self.assertEqual(rendered, [])
+                self.assertContains(response, 'Пост 2')
+
+    def test_edit_rerenders_only_that_card(self):
+        url = reverse('post:group', args=['group'])
+        self.rendered_cards(url)
+        post = self.posts[0]
+        post.text = 'Исправленный пост'
+        post.save()
+        response, rendered = self.rendered_cards(url)
+        self.assertEqual(len(rendered), 1)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotContains(response, 'Пост 0')
@@ -0,0 +1,56 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from .utils import FeedQueriesMixin
+
+
+class CommentPaginationTest(FeedQueriesMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+        cls.url = reverse(
+            'post:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.commentators = [
+            User.objects.create_user(username=f'commentator_{number}')
+            for number in range(25)
+        ]
+        for number, user in enumerate(cls.commentators):
+            Comment.objects.create(
+                post=cls.post, author=user, text=f'Комментарий {number}'
+            )
+
+    def test_comments_are_paginated_oldest_first(self):
+        response = self.client.get(self.url)
+        first_page = response.context['comments']
+        self.assertEqual(len(first_page), 20)
+        self.assertEqual(first_page[0].text, 'Комментарий 0')
+        response = self.client.get(
+            self.url + f'?after={first_page.next_cursor}'
+        )
+        second_page = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in second_page],
+            [f'Комментарий {number}' for number in range(20, 25)]
+        )
+        self.assertFalse(second_page.has_next())
+
+    def test_comments_newest_first(self):
+        response = self.client.get(self.url + '?order=newest')
+        comments = response.context['comments']
+        self.assertEqual(comments[0].text, 'Комментарий 24')
+        self.assertEqual(comments[19].text, 'Комментарий 5')
+
+    def test_comment_page_makes_fixed_number_of_queries(self):
+        post = Post.objects.create(author=self.author, text='Другой пост')
+        users = iter(self.commentators)
+        self.assertFeedQueriesConstant(
+            Client(),
+            reverse('post:post_detail', kwargs={'post_id': post.pk}),
+            lambda: Comment.objects.create(
+                post=post, author=next(users), text='Комментарий'
+            ),
+        )
@@ -0,0 +1,120 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'post': reverse('post:post_detail', args=[self.post.pk]),
+            'profile': reverse('post:profile', args=['author']),
+            'group': reverse('post:group', args=['group']),
+        }
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_rendering(self):
+        """304 отдаётся одним запросом валидатора, без шаблонов."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_validators_do_not_read_posts(self):
+        """Валидатор профиля и группы - одна строка по индексу."""
+        for name in ('profile', 'group'):
+            with self.subTest(page=name):
+                url = self.urls[name]
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 1)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'EXPLAIN QUERY PLAN ' + queries[0]['sql']
+                    )
+                    plan = ' | '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotIn('SCAN', plan)
+                self.assertNotRegex(plan, r'posts_post\b')
+
+    def test_post_edit_and_move_invalidate_etag(self):
+        other = Group.objects.create(title='Другая', slug='other')
+        urls = [
+            self.urls['profile'], self.urls['group'],
+            reverse('post:group', args=['other']),
+        ]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate_etag(self):
+        etags = {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ага'
+        )
+        Post.objects.filter(pk=self.post.pk).update(text='Правка')
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_other_posts_keep_etag(self):
+        """Посты вне страницы её ETag не меняют."""
+        other = User.objects.create_user(username='other')
+        etags = {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+        Post.objects.create(author=other, text='Чужой пост')
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_reader(self):
+        reader = Client()
+        reader.force_login(self.reader)
+        url = self.urls['profile']
+        etag = reader.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        self.assertEqual(self.revalidate(reader, url).status_code, 304)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = reader.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages_are_404(self):
+        response = self.client.get(reverse('post:profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import exporter
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for index in range(5):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {index}'
+            )
+        Comment.objects.create(post=post, author=cls.admin, text='Ага')
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def export(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export')
+            call_command('export_yatube', *args, output=path)
+            with open(path, 'rb') as output:
+                return output.read()
+
+    def test_ndjson_contains_all_tables(self):
+        lines = self.export().decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['model'] for row in rows],
+            ['posts'] * 5 + ['comments', 'follows'],
+        )
+        self.assertEqual(rows[0]['text'], 'Пост 0')
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[-1]['user'], 'admin')
+
+    def test_csv_single_table(self):
+        data = self.export('posts', '--format', 'csv').decode()
+        rows = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual(
+            [row['text'] for row in rows], [f'Пост {i}' for i in range(5)]
+        )
+        with self.assertRaises(CommandError):
+            self.export('posts', 'comments', '--format', 'csv')
+        with self.assertRaises(CommandError):
+            self.export('users')
+
+    def test_gzip(self):
+        self.assertEqual(
+            gzip.decompress(self.export('posts', '--gzip')),
+            self.export('posts'),
+        )
+
+    def test_small_chunks_keep_all_rows(self):
+        chunks = list(exporter.export_chunks(['posts'], chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks).count(b'\n'), 5)
+
+    def test_view_streams_for_staff_only(self):
+        url = reverse('post:export')
+        client = Client()
+        client.force_login(self.author)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.admin)
+        response = client.get(url, {'model': 'posts', 'format': 'csv'})
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('yatube-posts.csv', response['Content-Disposition'])
+        self.assertEqual(
+            len(b''.join(response.streaming_content).splitlines()), 6
+        )
+        response = client.get(url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
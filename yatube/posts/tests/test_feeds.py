@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class SyndicationFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('post:feed', args=['rss']),
+            reverse('post:feed', args=['atom']),
+            reverse('post:group_feed', args=['group', 'rss']),
+            reverse('post:profile_feed', args=['author', 'atom']),
+        ]
+
+    def test_feeds_list_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Первый пост')
+                self.assertIn('xml', response['Content-Type'])
+
+    def test_poll_is_one_cache_get(self):
+        for url in self.urls:
+            self.client.get(url)
+        for url in self.urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.assertContains(self.client.get(url), 'Первый пост')
+
+    def test_not_modified(self):
+        url = self.urls[0]
+        response = self.client.get(url)
+        response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_scope(self):
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.create(author=self.author, text='Второй пост')
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                if 'group' in url:
+                    self.assertNotContains(response, 'Второй пост')
+                else:
+                    self.assertContains(response, 'Второй пост')
+
+    def test_moving_post_invalidates_old_group(self):
+        url = reverse('post:group_feed', args=['group', 'rss'])
+        self.client.get(url)
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertNotContains(self.client.get(url), 'Первый пост')
+
+    def test_links_follow_request_host(self):
+        url = self.urls[0]
+        self.client.get(url)
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertContains(response, 'http://localhost/')
+        self.assertNotContains(response, 'testserver')
+        response = self.client.get(url, secure=True)
+        self.assertContains(response, 'https://testserver/')
+
+    def test_group_edit_invalidates_group_feed(self):
+        url = reverse('post:group_feed', args=['group', 'rss'])
+        self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertContains(self.client.get(url), 'Новое название')
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_format_and_scope(self):
+        for url in (
+            reverse('post:feed', args=['json']),
+            reverse('post:group_feed', args=['missing', 'rss']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,7 +1,7 @@
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Group, Post, User, Follow
+from ..models import Group, Post, User, Follow, TimelineEntry
 
 
 class FollowTest(TestCase):
@@ -89,3 +89,51 @@ class FollowTest(TestCase):
         self.assertTrue(Follow.objects.filter(
             author=self.author,
             user=self.user).exists())
+
+    def test_timeline_is_trimmed_on_unfollow(self):
+        """После отписки посты автора пропадают из ленты."""
+        follow = Follow.objects.create(author=self.author, user=self.user)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_at_query_time(self):
+        """Посты популярного автора не раскладываются,
+           но попадают в ленту при чтении."""
+        other_author = User.objects.create_user(username='OtherAuthor')
+        Follow.objects.create(author=self.author, user=self.user)
+        Follow.objects.create(author=other_author, user=self.user)
+        other_post = Post.objects.create(author=other_author, text='Другой')
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorize_client.get(reverse('post:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [other_post, self.post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_limit_again_keeps_posts_in_feeds(self):
+        """Посты, написанные автором выше лимита, остаются в лентах,
+           когда подписчиков снова становится меньше лимита."""
+        other_user = User.objects.create_user(username='OtherUser')
+        Follow.objects.create(author=self.author, user=self.user)
+        other_follow = Follow.objects.create(author=self.author,
+                                             user=other_user)
+        pulled_post = Post.objects.create(author=self.author, text='Пулл')
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=pulled_post).exists()
+        )
+        other_follow.delete()
+        response = self.authorize_client.get(reverse('post:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [pulled_post, self.post]
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=pulled_post
+            ).exists()
+        )
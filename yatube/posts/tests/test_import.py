@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import timeline
+from ..importer import Importer
+from ..models import (Follow, Group, ImportCheckpoint, Post, TimelineEntry,
+                      User)
+from ..search import search_posts
+from ..stats import get_stats
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+
+    def write_jsonl(self, rows):
+        path = os.path.join(self.workdir, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as source:
+            for row in rows:
+                source.write(
+                    row if isinstance(row, str) else json.dumps(row)
+                )
+                source.write('\n')
+        return path
+
+    def posts_count(self):
+        return get_stats(User.objects.get(pk=self.author.pk)).posts_count
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import(self):
+        path = self.write_jsonl([
+            {'text': 'Первый', 'author': 'author', 'group': 'group',
+             'pub_date': '2020-01-02T03:04:05+00:00'},
+            {'text': 'Второй', 'author': 'author'},
+            {'text': 'Без автора', 'author': 'nobody'},
+            {'text': '', 'author': 'author'},
+            'not json',
+        ])
+        out, err = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Импортировано постов: 2, пропущено строк: 3', out)
+        self.assertIn("Строка 3: нет автора 'nobody'", err)
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.isoformat(),
+                         '2020-01-02T03:04:05+00:00')
+
+    def test_malformed_rows_skipped(self):
+        """Строки неверных типов и дат пропускаются, а не рвут импорт."""
+        path = self.write_jsonl([
+            {'text': 'Верный', 'author': 'author'},
+            {'text': 'Дата', 'author': 'author',
+             'pub_date': '2020-02-30T10:00:00'},
+            {'text': 'Дата числом', 'author': 'author', 'pub_date': 5},
+            {'text': 5, 'author': 'author'},
+            {'text': 'Автор списком', 'author': ['author']},
+            {'text': 'Группа списком', 'author': 'author', 'group': ['g']},
+        ])
+        out, err = self.run_import(path)
+        self.assertIn('Импортировано постов: 1, пропущено строк: 5', out)
+        self.assertIn("Строка 2: неверная дата '2020-02-30T10:00:00'", err)
+        self.assertIn('Строка 4: текст не является строкой', err)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Верный']
+        )
+
+    def test_pub_dates_without_touching_model(self):
+        """Даты из источника пишутся, а auto_now_add модели не трогается."""
+        dates = ['2020-01-0%dT00:00:00+00:00' % day for day in (3, 1, 2)]
+        path = self.write_jsonl([
+            {'text': f'Пост {number}', 'author': 'author', 'pub_date': date}
+            for number, date in enumerate(dates)
+        ])
+        field = Post._meta.get_field('pub_date')
+        flags = []
+        fan_out_many = timeline.fan_out_many
+
+        def checked_fan_out(posts):
+            flags.append(field.auto_now_add)
+            fan_out_many(posts)
+
+        with mock.patch.object(timeline, 'fan_out_many', checked_fan_out):
+            self.run_import(path)
+        self.assertEqual(flags, [True])
+        for number, date in enumerate(dates):
+            post = Post.objects.get(text=f'Пост {number}')
+            self.assertEqual(post.pub_date.isoformat(), date)
+            self.assertEqual(
+                TimelineEntry.objects.get(post=post).pub_date, post.pub_date
+            )
+
+    def test_signal_side_effects(self):
+        """Импорт обновляет счётчики, ленты подписок и поиск."""
+        path = self.write_jsonl(
+            [{'text': f'Ежик {number}', 'author': 'author'}
+             for number in range(3)]
+        )
+        self.run_import(path)
+        self.assertEqual(self.posts_count(), 3)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(search_posts('ежик').count(), 3)
+
+    def test_csv_and_create_authors(self):
+        path = os.path.join(self.workdir, 'posts.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as source:
+            writer = csv.DictWriter(source, ['text', 'author', 'group'])
+            writer.writeheader()
+            writer.writerow({'text': 'Из CSV', 'author': 'newcomer'})
+        self.run_import(path, '--create-authors')
+        post = Post.objects.get(text='Из CSV')
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_resume_after_failure(self):
+        """После сбоя импорт продолжается без пропусков и повторов."""
+        path = self.write_jsonl(
+            [{'text': f'Пост {number}', 'author': 'author'}
+             for number in range(5)]
+        )
+        write = Importer.write
+        calls = []
+
+        def failing_write(importer, batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            write(importer, batch)
+
+        with mock.patch.object(Importer, 'write', failing_write):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().position, 2)
+
+        out, _ = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Продолжаем после строки 2', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {number}' for number in range(5)],
+        )
+        self.assertEqual(self.posts_count(), 5)
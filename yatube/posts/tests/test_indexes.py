@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..paginators import encode_cursor
+
+
+class FeedQueryPlanTest(TestCase):
+    """Ленты читаются по индексу, без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовый текст',
+        )
+        for number in range(15):
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.cursor = encode_cursor(
+            Post.objects.values_list('pub_date', 'id')
+            .order_by('-pub_date', '-id')[4]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans[sql] = ' | '.join(row[-1] for row in cursor.fetchall())
+        return plans
+
+    def test_feeds_do_not_sort_in_temp_btree(self):
+        urls = [
+            reverse('post:main'),
+            reverse('post:main') + '?page=2',
+            reverse('post:main') + f'?after={self.cursor}',
+            reverse('post:main') + f'?before={self.cursor}',
+            reverse('post:group', kwargs={'slug': self.group.slug}),
+            reverse('post:group', kwargs={'slug': self.group.slug})
+            + f'?after={self.cursor}',
+            reverse('post:profile', kwargs={'username': 'test_user'}),
+            reverse('post:profile', kwargs={'username': 'test_user'})
+            + f'?after={self.cursor}',
+            reverse('post:follow_index'),
+            reverse('post:follow_index') + f'?after={self.cursor}',
+            reverse('post:post_detail', kwargs={'post_id': 1}),
+        ]
+        for url in urls:
+            plans = self.query_plans(url)
+            self.assertTrue(plans, url)
+            for sql, plan in plans.items():
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertNotRegex(plan, r'SCAN (TABLE )?posts_post$')
+
+    def test_follow_feed_is_timeline_range_scan(self):
+        plans = self.query_plans(reverse('post:follow_index'))
+        self.assertTrue(any(
+            'timeline_user_pub_date_idx' in plan for plan in plans.values()
+        ))
@@ -0,0 +1,128 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotFound
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..page_cache import feed_page_cache
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=cls.author, group=cls.group,
+                            text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_page_body_shared_and_header_per_user(self):
+        for url in (reverse('post:main'),
+                    reverse('post:group', args=['group']),
+                    reverse('post:profile', args=['author'])):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Войти')
+                response = self.reader_client.get(url)
+                self.assertFalse(
+                    any(template.name.startswith('posts/')
+                        for template in response.templates)
+                )
+                self.assertContains(response, 'Первый пост')
+                self.assertContains(response, 'Пользователь: reader')
+                self.assertNotContains(response, 'Войти')
+                self.assertNotContains(response, 'page-hole')
+
+    def test_anonymous_hit_makes_no_queries(self):
+        url = reverse('post:main')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'Первый пост')
+
+    def test_key_ignores_parameter_order(self):
+        url = reverse('post:main')
+        self.client.get(url + '?page=1&after=')
+        with self.assertNumQueries(0):
+            self.client.get(url + '?after=&page=1')
+
+    def test_unknown_parameters_not_cached(self):
+        """Произвольная query string не заполняет кеш страниц."""
+        url = reverse('post:group', args=['group'])
+        for query in ('?utm=1', '?page=1&page=2'):
+            with self.subTest(query=query):
+                self.client.get(url + query)
+                response = self.client.get(url + query)
+                self.assertContains(response, 'Первый пост')
+                self.assertIn(
+                    'posts/group_list.html',
+                    [template.name for template in response.templates],
+                )
+
+    def test_group_and_author_edits_refresh_page(self):
+        """Новый ETag не уходит со старым телом из кеша страниц."""
+        pages = [
+            (reverse('post:group', args=['group']), Group, 'group',
+             {'title': 'Новое название'}, 'Новое название'),
+            (reverse('post:profile', args=['author']), User, 'author',
+             {'first_name': 'Лев', 'last_name': 'Толстой'}, 'Лев Толстой'),
+        ]
+        for url, model, name, changes, text in pages:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                instance = getattr(self, name)
+                for field, value in changes.items():
+                    setattr(instance, field, value)
+                instance.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, text)
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_post_invalidates_pages(self):
+        url = reverse('post:main')
+        self.client.get(url)
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertContains(self.client.get(url), 'Второй пост')
+
+    def test_follow_button_follows_the_user(self):
+        url = reverse('post:profile', args=['author'])
+        self.assertNotContains(self.client.get(url), 'Подписаться')
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        self.reader_client.get(reverse('post:profile_follow',
+                                       args=['author']))
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+
+    def feed_responses(self, response, times=2):
+        calls = []
+
+        @feed_page_cache('index')
+        def view(request):
+            calls.append(request)
+            return response
+
+        responses = []
+        for _ in range(times):
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            responses.append(view(request))
+        return responses, len(calls)
+
+    def test_feed_cache_keeps_status_and_content_type(self):
+        responses, calls = self.feed_responses(HttpResponseNotFound('Нет'))
+        self.assertEqual(calls, 2)
+        for response in responses:
+            self.assertEqual(response.status_code, 404)
+        cache.clear()
+        responses, calls = self.feed_responses(
+            HttpResponse('{}', content_type='application/json')
+        )
+        self.assertEqual(calls, 1)
+        self.assertEqual(responses[1].status_code, 200)
+        self.assertEqual(responses[1]['Content-Type'], 'application/json')
@@ -1,7 +1,14 @@
+import html
+import re
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Group, Post, User
+from ..paginators import encode_cursor
 
 
 class PaginatorViewsTest(TestCase):
@@ -25,6 +32,10 @@ class PaginatorViewsTest(TestCase):
         ]
         cls.post = Post.objects.bulk_create(objs)
 
+    def setUp(self):
+        # bulk_create не сбрасывает кеш страниц (page_cache.py).
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         """Проверка: на первой странице должно быть 10 постов."""
         response = self.client.get(reverse('post:main'))
@@ -47,3 +58,51 @@ class PaginatorViewsTest(TestCase):
         response = self.client.get(reverse(
             'post:profile', kwargs={'username': self.author.username}))
         self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсорная пагинация проходит ленту без пропусков и повторов."""
+        response = self.client.get(reverse('post:main') + '?page=1')
+        first_page = list(response.context['page_obj'])
+        cursor = encode_cursor(
+            [first_page[-1].pub_date, first_page[-1].pk]
+        )
+        response = self.client.get(reverse('post:main') + f'?after={cursor}')
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertEqual(
+            {post.pk for post in first_page + list(second_page)},
+            set(Post.objects.values_list('pk', flat=True))
+        )
+        response = self.client.get(
+            reverse('post:main') + f'?before={second_page.previous_cursor}'
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_next_link_is_cursor(self):
+        """Ссылка "Следующая" с нумерованной страницы - курсорная."""
+        url = reverse('post:main')
+        response = self.client.get(url)
+        next_link = re.search(
+            r'href="(\?after=[^"]+)">\s*Следующая', response.content.decode()
+        )
+        self.assertIsNotNone(next_link)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + html.unescape(next_link[1]))
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+                for query in queries)
+        )
+        first_page = set(Post.objects.order_by('-pub_date', '-id')
+                         .values_list('pk', flat=True)[:10])
+        self.assertFalse(
+            first_page & {post.pk for post in response.context['page_obj']}
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор отдаёт первую страницу."""
+        response = self.client.get(reverse('post:main') + '?after=broken')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 10)
@@ -0,0 +1,61 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from .utils import FeedQueriesMixin
+
+
+class FeedQueriesTest(FeedQueriesMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовый текст',
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author_{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}',
+            )
+            for number in range(10)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.created = 0
+
+    def make_post(self):
+        # Каждый пост от нового автора, чтобы N+1 по авторам был заметен.
+        author = self.authors[self.created % len(self.authors)]
+        self.created += 1
+        Post.objects.create(author=author, group=self.group, text='Текст')
+
+    def test_feed_pages_make_fixed_number_of_queries(self):
+        urls = [
+            reverse('post:main'),
+            reverse('post:group', kwargs={'slug': self.group.slug}),
+            reverse('post:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                self.assertFeedQueriesConstant(
+                    self.reader_client, url, self.make_post
+                )
+
+    def test_profile_makes_fixed_number_of_queries(self):
+        author = self.authors[0]
+        self.assertFeedQueriesConstant(
+            self.reader_client,
+            reverse('post:profile', kwargs={'username': author.username}),
+            lambda: Post.objects.create(
+                author=author, group=self.group, text='Текст'
+            ),
+        )
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from ..search import search_posts, search_terms, text_expression
+from ..views import AMOUNT_POST
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Ёжики <b>туманные</b> гуляют по лесу',
+        )
+        cls.commented = Post.objects.create(
+            author=cls.other, text='Просто пост без ключевых слов',
+        )
+        Comment.objects.create(
+            post=cls.commented, author=cls.author, text='А где ежики?',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, text, **filters):
+        return list(search_posts(text, **filters)[:AMOUNT_POST])
+
+    def test_post_and_comment_found(self):
+        """Ищется и текст поста, и комментарии, без учёта ё и регистра."""
+        self.assertEqual(
+            self.found('ежики'), [self.post, self.commented]
+        )
+
+    def test_filters(self):
+        for ranked in (10000, 0):
+            with self.subTest(ranked=ranked), \
+                    mock.patch('posts.search.RANKED_TERM_DOCS', ranked):
+                self.assertEqual(
+                    self.found('ежики', author=self.other), [self.commented]
+                )
+                self.assertEqual(
+                    self.found('ежики', group=self.group), [self.post]
+                )
+
+    def test_broad_query_sorted_by_date(self):
+        """Слишком частые слова не ранжируются: новые посты первыми."""
+        with mock.patch('posts.search.RANKED_TERM_DOCS', 1):
+            self.assertEqual(
+                self.found('ежики'), [self.commented, self.post]
+            )
+
+    def test_results_capped(self):
+        with mock.patch('posts.search.MAX_RESULTS', 1):
+            results = search_posts('ежики')
+            self.assertEqual(results.count(), 1)
+            self.assertTrue(results.truncated)
+            self.assertEqual(len(results[:AMOUNT_POST]), 1)
+
+    def test_index_follows_changes(self):
+        """Триггеры держат индекс в актуальном состоянии."""
+        Post.objects.filter(pk=self.post.pk).update(text='Совы')
+        Comment.objects.filter(post=self.commented).delete()
+        self.assertEqual(self.found('ежики'), [])
+        self.assertEqual(self.found('совы'), [self.post])
+
+    def test_comments_indexed_separately(self):
+        """Комментарий - своя строка индекса; перенос поста - метки."""
+        second = Comment.objects.create(
+            post=self.commented, author=self.other, text='Ежики тут',
+        )
+        Comment.objects.filter(post=self.commented).exclude(
+            pk=second.pk
+        ).delete()
+        self.assertEqual(self.found('ежики'), [self.post, self.commented])
+        Post.objects.filter(pk=self.commented.pk).update(group=self.group)
+        self.assertEqual(
+            self.found('ежики', group=self.group),
+            [self.post, self.commented],
+        )
+
+    def test_snippet_escaped_and_highlighted(self):
+        post = self.found('туманные')[0]
+        self.assertIn('<mark>туманные</mark>', post.snippet)
+        self.assertIn('&lt;b&gt;', post.snippet)
+
+    def test_query_syntax_not_executed(self):
+        """Операторы FTS5 из запроса пользователя не выполняются."""
+        self.assertEqual(
+            text_expression(search_terms('author: u1 OR "x*')),
+            'text: ("author" "u1" "OR" "x")',
+        )
+        self.assertEqual(self.found('NEAR(ежики'), [])
+
+    def test_view_paginates_and_keeps_query(self):
+        for number in range(AMOUNT_POST + 1):
+            Post.objects.create(author=self.other, text=f'Совы {number}')
+        response = Client().get(reverse('post:search'), {'q': 'совы'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, AMOUNT_POST + 1)
+        self.assertEqual(len(page_obj), AMOUNT_POST)
+        self.assertContains(response, '?q=%D1%81%D0%BE%D0%B2%D1%8B&amp;page=2')
+
+    def test_unknown_author(self):
+        response = Client().get(
+            reverse('post:search'), {'q': 'ежики', 'author': 'nobody'}
+        )
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'Такого автора нет.')
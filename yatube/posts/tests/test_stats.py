@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import stats
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+        Post.objects.create(author=cls.author, text='Ещё текст')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ок')
+
+    def assertStats(self, user, **expected):
+        stats = AuthorStats.objects.get(author=user)
+        for counter, value in expected.items():
+            with self.subTest(user=user, counter=counter):
+                self.assertEqual(getattr(stats, counter), value)
+
+    def test_signals_keep_counters(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        self.assertStats(self.author, posts_count=2, followers_count=1)
+        self.assertStats(self.user, following_count=1, comments_count=1)
+        Follow.objects.filter(user=self.user).delete()
+        self.post.delete()
+        self.assertStats(self.author, posts_count=1, followers_count=0)
+        self.assertStats(self.user, following_count=0, comments_count=0)
+
+    def test_drifted_counter_stays_at_zero(self):
+        """Удаление при разошедшемся нулевом счётчике не падает."""
+        AuthorStats.objects.filter(author=self.author).update(posts_count=0)
+        AuthorStats.objects.filter(author=self.user).update(
+            comments_count=0
+        )
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertStats(self.author, posts_count=0)
+        self.assertStats(self.user, comments_count=0)
+        stats.bump_many('followers_count', {self.author.pk: -5})
+        self.assertStats(self.author, followers_count=0)
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile_stats пересчитывает разошедшиеся счётчики."""
+        AuthorStats.objects.filter(author=self.author).update(
+            posts_count=100, followers_count=7
+        )
+        AuthorStats.objects.filter(author=self.user).delete()
+        call_command('reconcile_stats', stdout=StringIO())
+        self.assertStats(self.author, posts_count=2, followers_count=1)
+        self.assertStats(self.user, following_count=1, comments_count=1)
+
+    def test_detail_reads_counter_without_aggregates(self):
+        """Страница поста не считает посты автора запросом."""
+        url = reverse('post:post_detail', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['posts_counter'], 2)
+        self.assertFalse(
+            [q['sql'] for q in queries if 'COUNT("posts_post"' in q['sql']]
+        )
+
+    def test_profile_reads_counter_from_stats(self):
+        response = self.client.get(
+            reverse('post:profile', kwargs={'username': 'test_user'})
+        )
+        self.assertEqual(response.context['counter_posts'], 2)
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, User
+from ..thumbnails import clear_memo, generate, ready_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        clear_memo()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def upload(self, name='small.gif'):
+        return SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def test_feed_shows_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, лента не создаёт её сама."""
+        post = Post.objects.create(
+            author=self.author, text='Текст', image=self.upload()
+        )
+        content = self.client.get(reverse('post:main')).content.decode()
+        self.assertNotIn('<img class="img-thumbnail', content)
+        self.assertIsNone(ready_thumbnail(post.image, 'card'))
+        # Готовая миниатюра сама сбрасывает закешированные страницы.
+        generate(post.image.name)
+        content = self.client.get(reverse('post:main')).content.decode()
+        self.assertIn(ready_thumbnail(post.image, 'card').url, content)
+
+    def test_ready_thumbnail_changes_etag(self):
+        """Готовая миниатюра меняет ETag страниц поста и автора."""
+        post = Post.objects.create(
+            author=self.author, text='Текст', image=self.upload()
+        )
+        urls = [
+            reverse('post:post_detail', args=[post.pk]),
+            reverse('post:profile', args=[self.author.username]),
+        ]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        generate(post.image.name)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_create_view_schedules_all_sizes(self):
+        """После сохранения поста готовятся миниатюры всех размеров."""
+        with mock.patch(
+            'posts.thumbnails.transaction.on_commit',
+            side_effect=lambda callback: callback()
+        ):
+            self.client.post(
+                reverse('post:create'),
+                data={'text': 'Пост с картинкой', 'image': self.upload()},
+            )
+        post = Post.objects.get(text='Пост с картинкой')
+        for size in settings.POST_THUMBNAILS:
+            with self.subTest(size=size):
+                self.assertIsNotNone(ready_thumbnail(post.image, size))
+
+    def test_feed_page_looks_up_thumbnails_in_one_query(self):
+        """Миниатюры страницы читаются из хранилища одним запросом."""
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.author,
+                text=f'Пост {number}',
+                image=self.upload(f'small_{number}.gif'),
+            )
+            generate(post.image.name)
+        cache.clear()
+        clear_memo()
+        with CaptureQueriesContext(connection) as queries:
+            content = self.client.get(reverse('post:main')).content.decode()
+        self.assertEqual(content.count('<img class="img-thumbnail'), 5)
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('post:main'))
+        self.assertFalse(
+            [q for q in queries if 'thumbnail_kvstore' in q['sql']]
+        )
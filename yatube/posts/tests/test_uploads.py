@@ -0,0 +1,80 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name, size, image_format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=Image.MIME[image_format]
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIDE=100)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('post:create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def test_small_image_saved_as_is(self):
+        """Картинка в пределах лимита сохраняется без перекодирования."""
+        upload = make_image('small.png', (40, 30), 'PNG')
+        self.create(upload)
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
+        upload.seek(0)
+        with post.image.open() as stored:
+            self.assertEqual(stored.read(), upload.read())
+
+    def test_large_image_downscaled(self):
+        """Большая картинка уменьшается до POST_IMAGE_MAX_SIDE."""
+        self.create(make_image('large.jpg', (400, 200)))
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 50))
+            self.assertEqual(stored.format, 'JPEG')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с лишними пикселями отклоняется до декодирования."""
+        response = self.create(make_image('huge.png', (200, 200), 'PNG'))
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context['form'].has_error(
+            'image', 'too_many_pixels'
+        ))
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_too_large_file_rejected(self):
+        response = self.create(make_image('small.png', (40, 30), 'PNG'))
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context['form'].has_error(
+            'image', 'file_too_large'
+        ))
@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -34,6 +35,11 @@ class URLTests(TestCase):
         cls.authorized_client_1 = Client()
         cls.authorized_client_1.force_login(cls.no_author)
 
+    def setUp(self):
+        # Страницы лент кешируются целиком (page_cache.py), а тесты
+        # проверяют шаблоны.
+        cache.clear()
+
     def test_pages_exists_at_desired_location(self):
         """Страница доступна любому пользователю"""
         pages_url = {
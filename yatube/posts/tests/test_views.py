@@ -56,6 +56,11 @@ class ViewsTests(TestCase):
         cls.authorized_client_1 = Client()
         cls.authorized_client_1.force_login(cls.user)
 
+    def setUp(self):
+        # Страницы лент кешируются целиком (page_cache.py), а тесты
+        # проверяют контекст шаблонов.
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
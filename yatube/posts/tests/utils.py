@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class FeedQueriesMixin:
+    """Проверка, что страница ленты делает фиксированное число запросов."""
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertFeedQueriesConstant(self, client, url, make_post, posts=9):
+        """Число запросов не растёт с числом постов на странице.
+
+        make_post() создаёт пост, попадающий на страницу url.
+        """
+        make_post()
+        expected = self.count_queries(client, url)
+        for _ in range(posts):
+            make_post()
+        self.assertEqual(
+            self.count_queries(client, url),
+            expected,
+            f'Число запросов страницы {url} зависит от числа постов'
+        )
@@ -0,0 +1,171 @@
+"""Миниатюры картинок постов.
+
+Миниатюры всех размеров из POST_THUMBNAILS готовятся в пуле потоков
+после сохранения поста, а шаблоны лишь читают уже готовые: пока
+миниатюры нет, вместо неё выводится заглушка.
+
+Готовые миниатюры целой страницы ленты ищутся одним запросом
+(resolve) и запоминаются в LRU процесса.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.lru import LRU
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_memo = LRU(settings.THUMBNAIL_LRU_SIZE)
+
+
+def thumbnail_options(source, size):
+    """Геометрия и опции размера так, как их дополняет sorl.
+
+    Повторяет ThumbnailBackend.get_thumbnail, чтобы имя миниатюры
+    совпадало с тем, что sorl создаёт сам.
+    """
+    geometry, options = settings.POST_THUMBNAILS[size]
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return geometry, options
+
+
+def thumbnail_file(image, size):
+    """Файл миниатюры размера size, не проверяя, создан ли он."""
+    source = ImageFile(image)
+    geometry, options = thumbnail_options(source, size)
+    name = default.backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def _lookup(keys):
+    """Читает записи миниатюр из хранилища sorl за один заход."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get(key) for key in keys}
+    raw_keys = {add_prefix(key): key for key in keys}
+    found = kvstore.cache.get_many(list(raw_keys))
+    missing = [key for key in raw_keys if key not in found]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        # Как и sorl, запоминаем в кеше отсутствие записи.
+        kvstore.cache.set_many(
+            {key: rows.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        found.update(rows)
+    return {
+        raw_keys[key]: deserialize_image_file(value)
+        for key, value in found.items()
+        if value and value != EMPTY_VALUE
+    }
+
+
+def resolve(images, size):
+    """Готовые миниатюры размера size для набора картинок.
+
+    Возвращает словарь {имя картинки: миниатюра или None}. Всё, чего
+    нет в LRU процесса, читается из хранилища sorl одним заходом.
+    """
+    result, pending = {}, {}
+    for image in images:
+        if not image:
+            continue
+        thumbnail = thumbnail_file(image, size)
+        cached = _memo.get(thumbnail.key)
+        if cached is not None:
+            result[str(image)] = cached
+        else:
+            pending[str(image)] = thumbnail
+    if pending:
+        found = _lookup([thumbnail.key for thumbnail in pending.values()])
+        for name, thumbnail in pending.items():
+            result[name] = found.get(thumbnail.key)
+            if result[name] is not None:
+                _memo.set(thumbnail.key, result[name])
+    return result
+
+
+def clear_memo():
+    _memo.clear()
+
+
+def ready_thumbnail(image, size):
+    """Готовая миниатюра или None, если она ещё не создана."""
+    if not image:
+        return None
+    return resolve([image], size).get(str(image))
+
+
+def generate(image):
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        try:
+            get_thumbnail(image, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s', image)
+    # Страницы с заглушкой вместо миниатюры устарели: ETag поста
+    # считается от updated_at, страниц автора и группы - от их
+    # поколений (posts/etags.py), а ленты - от поколения лент.
+    posts = Post.objects.filter(image=image)
+    scopes = list(posts.values_list('author_id', 'group_id'))
+    posts.update(updated_at=timezone.now())
+    feed_cache.bump_post_generations(
+        [author_id for author_id, _ in scopes],
+        [group_id for _, group_id in scopes],
+    )
+    feed_cache.bump_feed_generation()
+
+
+def _generate_in_worker(image):
+    try:
+        generate(image)
+    finally:
+        # У потока пула своё соединение с базой, его надо закрыть.
+        connection.close()
+
+
+def _submit(image):
+    global _executor
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        # Базу в памяти нельзя безопасно делить между потоками.
+        generate(image)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    _executor.submit(_generate_in_worker, image)
+
+
+def schedule(post):
+    """Ставит в очередь миниатюры картинки поста после коммита."""
+    if post.image:
+        image = post.image.name
+        transaction.on_commit(lambda: _submit(image))
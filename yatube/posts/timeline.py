@@ -0,0 +1,155 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации пост раскладывается в TimelineEntry каждого подписчика,
+и лента читается одним диапазоном по индексу (user, pub_date, post).
+Авторы с числом подписчиков от TIMELINE_FANOUT_LIMIT не раскладываются:
+их посты подмешиваются в ленту во время чтения.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import (AuthorStats, Follow, Post, TimelineEntry,
+                     with_feed_relations)
+from .paginators import FEED_ORDERING, paginate
+
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def is_fanout_author(author_id):
+    return not AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_many(posts, batch_size=500):
+    """Раскладывает по лентам сразу много постов (для импорта).
+
+    posts - QuerySet постов; пары "подписчик - пост" читаются одним
+    запросом с JOIN на подписки и пишутся пачками.
+    """
+    entries = (
+        posts.exclude(
+            author__stats__followers_count__gte=(
+                settings.TIMELINE_FANOUT_LIMIT
+            )
+        )
+        .filter(author__following__user__isnull=False)
+        .values_list('author__following__user_id', 'id', 'author_id',
+                     'pub_date')
+        .order_by()
+        .iterator()
+    )
+    batch = []
+    for user_id, post_id, author_id, pub_date in entries:
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        ))
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Дописывает в ленту нового подписчика последние посты автора."""
+    if not is_fanout_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        *FEED_ORDERING
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def rejoin_fanout(author_id):
+    """Раскладывает посты автора, снова ушедшего под лимит подписчиков.
+
+    Пока подписчиков было не меньше TIMELINE_FANOUT_LIMIT, его посты
+    читались при запросе ленты и в TimelineEntry не попадали. Без
+    этого они пропали бы из лент, как только автор снова стал
+    раскладываемым. Дописываются последние TIMELINE_BACKFILL_LIMIT
+    постов, как и новому подписчику.
+    """
+    crossed = AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT - 1,
+    ).exists()
+    if not crossed:
+        return
+    recent = Post.objects.filter(author_id=author_id).order_by(
+        *FEED_ORDERING
+    ).values('pk')[:settings.TIMELINE_BACKFILL_LIMIT]
+    fan_out_many(Post.objects.filter(pk__in=recent))
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def pull_authors(user):
+    """Авторы, на которых подписан user и чьи посты не раскладываются."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gte=(
+                settings.TIMELINE_FANOUT_LIMIT
+            ),
+        ).values_list('author_id', flat=True)
+    )
+
+
+def feed_page(request, user, per_page):
+    """Страница ленты подписок пользователя, элементы страницы - посты."""
+    pulled = pull_authors(user)
+    if pulled:
+        posts = Post.objects.feed().filter(
+            Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+            | Q(author__in=pulled)
+        )
+        return paginate(request, posts, per_page)
+    entries = with_feed_relations(
+        TimelineEntry.objects.filter(user=user), prefix='post__'
+    )
+    page = paginate(request, entries, per_page, TIMELINE_ORDERING)
+    page.object_list = [entry.post for entry in page.object_list]
+    return page
@@ -0,0 +1,103 @@
+"""Приём картинок постов.
+
+Загрузка пишется во временный файл (FILE_UPLOAD_HANDLERS), размер
+картинки проверяется по заголовку, до декодирования пикселей, а
+слишком большие картинки уменьшаются до POST_IMAGE_MAX_SIDE и
+перекодируются во временный же файл. Размеры готовой картинки
+сохраняются в посте, чтобы шаблонам не приходилось открывать файл.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Форматы, которые сохраняются после уменьшения как есть; остальные
+# перекодируются в JPEG или PNG в зависимости от прозрачности.
+SAVE_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+EXIF_ORIENTATION = 0x0112
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+
+
+def check_size(upload):
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)},
+        )
+
+
+def check_pixels(width, height):
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)s×%(height)s слишком большая.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def _open(upload):
+    upload.seek(0)
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    return Image.open(upload)
+
+
+def _output_format(image):
+    if image.format in SAVE_FORMATS:
+        return image.format
+    return 'PNG' if 'A' in image.getbands() else 'JPEG'
+
+
+def _downscale(image, upload):
+    """Уменьшает картинку и пишет результат во временный файл."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    image_format = _output_format(image)
+    # Для JPEG draft уменьшает картинку ещё при декодировании (в 2, 4
+    # или 8 раз), так что полный растр в память не попадает.
+    ratio = max_side / max(image.size)
+    image.draft('RGB', tuple(round(side * ratio) for side in image.size))
+    if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    name = upload.name
+    extension = Image.registered_extensions()
+    if extension.get(os.path.splitext(name)[1].lower()) != image_format:
+        name = '%s.%s' % (os.path.splitext(name)[0], image_format.lower())
+    # Безымянный временный файл удаляется сам, когда его закроют.
+    output = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+    image.save(output, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    result = UploadedFile(
+        output, name, Image.MIME[image_format], output.tell()
+    )
+    output.seek(0)
+    return result, image.size
+
+
+def process_image(upload):
+    """Проверяет загруженную картинку и при необходимости уменьшает её.
+
+    Возвращает файл для сохранения в посте и его размеры.
+    """
+    check_size(upload)
+    with _open(upload) as image:
+        # Image.open читает только заголовок.
+        width, height = image.size
+        check_pixels(width, height)
+        animated = getattr(image, 'is_animated', False)
+        if max(width, height) <= settings.POST_IMAGE_MAX_SIDE or animated:
+            upload.seek(0)
+            return upload, width, height
+        result, (width, height) = _downscale(image, upload)
+    return result, width, height
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'post'
 
@@ -8,12 +8,24 @@ urlpatterns = [
     path('', views.IndexView.as_view(), name='main'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('feed/<str:feed_format>/', feeds.site_feed, name='feed'),
+    path('group/<slug:slug>/feed/<str:feed_format>/', feeds.group_feed,
+         name='group_feed'),
+    path('profile/<str:username>/feed/<str:feed_format>/',
+         feeds.profile_feed, name='profile_feed'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.PostCreateView.as_view(), name='create'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export, name='export'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow_index, name='api_follow'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
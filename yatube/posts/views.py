@@ -1,70 +1,126 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.views.generic import ListView, CreateView
 
-from .forms import PostForm, CommentForm
+from . import etags, exporter, thumbnails, timeline
+from .forms import PostForm, CommentForm, SearchForm
 from .models import Post, User, Group, Comment, Follow
+from .page_cache import feed_page_cache, page_cache
+from .paginators import FEED_ORDERING, cursor_page, paginate
+from .search import search_posts
+from .stats import get_stats
 
 AMOUNT_POST = 10
+AMOUNT_COMMENTS = 20
+COMMENT_ORDERINGS = {
+    'oldest': ('created', 'id'),
+    'newest': ('-created', '-id'),
+}
 
 
+@method_decorator(feed_page_cache('index'), name='get')
 class IndexView(ListView):
     model = Post
     template_name = 'posts/index.html'
     paginate_by = AMOUNT_POST
 
     def get_queryset(self):
-        return Post.objects.all().order_by('-pub_date')
+        return Post.objects.feed().order_by(*FEED_ORDERING)
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(self.request, queryset, page_size)
+        return (
+            page.paginator,
+            page,
+            page.object_list,
+            page.has_other_pages()
+        )
 
 
+@condition(etag_func=etags.profile)
+@page_cache
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, AMOUNT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    counter_posts = author.posts.count()
-    following = request.user.is_authenticated
-    if following:
-        following = author.following.filter(user=request.user).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    counter_posts = get_stats(author).posts_count
+    page_obj = paginate(request, author.posts.feed(), AMOUNT_POST)
+    # Кнопка подписки - фрагмент под пользователя (follow_button.html).
     context = {
         'author': author,
         'page_obj': page_obj,
         'counter_posts': counter_posts,
-        'following': following
-
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=etags.group_posts)
+@page_cache
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    get_posts = Post.objects.filter(group=group)
-    posts = get_posts.order_by('-pub_date')[:AMOUNT_POST]
-    paginator = Paginator(posts, AMOUNT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, Post.objects.feed().filter(group=group), AMOUNT_POST
+    )
     context = {
         'page_obj': page_obj,
         'group': group,
-        'posts': posts,
+        'posts': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    query = ''
+    if form.is_valid():
+        results = search_posts(
+            form.cleaned_data['q'],
+            author=form.cleaned_data['author'],
+            group=form.cleaned_data['group'],
+        )
+        page_obj = Paginator(results, AMOUNT_POST).get_page(
+            request.GET.get('page')
+        )
+        params = request.GET.copy()
+        params.pop('page', None)
+        query = params.urlencode() + '&'
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query': query,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@condition(etag_func=etags.post_detail)
 def post_detail(request, post_id):
-    comments = Comment.objects.filter(post=post_id)
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, pk=post_id)
-    username_obj = User.objects.get(username=post.author)
-    posts_counter = username_obj.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    posts_counter = get_stats(post.author).posts_count
+    comments_order = request.GET.get('order')
+    if comments_order not in COMMENT_ORDERINGS:
+        comments_order = 'oldest'
+    comments = cursor_page(
+        request,
+        Comment.objects.filter(post=post).select_related('author'),
+        AMOUNT_COMMENTS,
+        COMMENT_ORDERINGS[comments_order],
+    )
     context = {
         'post': post,
         'posts_counter': posts_counter,
         'form': form,
         'comments': comments,
+        'comments_order': comments_order,
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -78,6 +134,7 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         self.post = form.save(commit=False)
         self.post.author = self.request.user
         self.post.save()
+        thumbnails.schedule(self.post)
         return redirect('post:profile', username=self.request.user)
 
 
@@ -92,7 +149,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -116,15 +175,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@feed_page_cache('follow')
 def follow_index(request):
-    # Выводит все посты автора,на которых подписан пользователь
-    # фильтрация по полям user,following,author
-    user = request.user
-    posts = Post.objects.filter(author__following__user=user)
-    paginator = Paginator(posts, AMOUNT_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
+    # Выводит все посты автора,на которых подписан пользователь.
+    # Лента читается из материализованного TimelineEntry (см. timeline.py)
+    page_obj = timeline.feed_page(request, request.user, AMOUNT_POST)
+    context = {
+        'page_obj': page_obj,
+    }
     return render(request,
                   "posts/follow.html",
                   context
@@ -154,3 +212,21 @@ def profile_unfollow(request, username):
     if follow.exists():
         follow.delete()
     return redirect('post:profile', username=username)
+
+
+@staff_member_required
+def export(request):
+    models = request.GET.getlist('model') or list(exporter.EXPORTS)
+    export_format = request.GET.get('format', 'ndjson')
+    gzip = bool(request.GET.get('gzip'))
+    try:
+        chunks = exporter.export_chunks(models, export_format, gzip)
+    except exporter.ExportError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        chunks, content_type=exporter.content_type(export_format, gzip)
+    )
+    response['Content-Disposition'] = 'attachment; filename="%s"' % (
+        exporter.filename(models, export_format, gzip)
+    )
+    return response
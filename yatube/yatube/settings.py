@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,9 +65,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос: не открывать файл и не
+        # повторять PRAGMA каждый раз.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Чтение с реплик, запись в default (core/routers.py). Реплика - ещё
+# одна запись DATABASES, например копия файла SQLite:
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+# Сколько секунд после записи пользователь читает из default.
+REPLICA_PIN_SECONDS = 10
+
+# Выполняются на каждом новом соединении с SQLite (core/sqlite.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    # Мс, сколько писатель ждёт занятую базу до "database is locked".
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - в КиБ, то есть 64 МиБ на соединение.
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -94,6 +123,20 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+# Сессия и пользователь запроса читаются из кеша, база - при промахе
+# (core/auth.py). Кеш общий: выход и смена пароля видны всем процессам
+# сразу, а не через LOCAL_TIMEOUT.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+# ModelBackend остаётся для сессий, начатых до CachedModelBackend: в
+# них записан его путь, и без него в списке Django их не примет.
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
 
@@ -105,9 +148,66 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# LRU процесса перед общим файловым кешем (core/cache.py).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'yatube_cache'),
-    }
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            # Сколько секунд процесс может не видеть чужую запись.
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'yatube_cache', 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
+
+# Лента подписок: посты авторов, у которых подписчиков не меньше
+# TIMELINE_FANOUT_LIMIT, не раскладываются по лентам при публикации,
+# а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_LIMIT = 1000
+
+# Ленты (posts/page_cache.py, feed_page_cache) сбрасываются поколением
+# (posts/feed_cache.py), таймаут лишь ограничивает жизнь неиспользуемых
+# ключей.
+FEED_CACHE_TIMEOUT = 60 * 15
+# Сколько секунд после FEED_CACHE_TIMEOUT лента ещё отдаётся, пока
+# его пересчитывают или пока база отвечает ошибками (core/cache.py).
+FEED_CACHE_GRACE = 60 * 5
+
+# Страницы лент целиком (posts/page_cache.py) и фрагменты под
+# пользователя в них. Страницы сбрасываются поколением ленты, таймаут
+# ограничивает устаревание из-за правок групп и авторов.
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Карточки постов (posts/cards.py) сбрасываются правкой поста, имени
+# автора или группы, таймаут лишь ограничивает жизнь неиспользуемых
+# ключей.
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# RSS/Atom сбрасываются при изменении постов (posts/feeds.py), таймаут
+# лишь ограничивает жизнь лент, которые никто не читает.
+SYNDICATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Размеры миниатюр, используемые в шаблонах: имя -> (геометрия, опции).
+POST_THUMBNAILS = {
+    'card': ('330x339', {'upscale': True}),
+    'wide': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_LRU_SIZE = 4096
+
+# Загрузки пишутся сразу на диск, а не в память процесса.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Ограничения картинок постов (posts/uploads.py).
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 1920